@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parser rápido frente a feedparser
+Mide tiempo por parseo y memoria pico (tracemalloc) sobre los feeds
+grabados en benchmarks/fixtures. Para medir feeds reales basta con
+guardarlos ahí, p. ej.: curl -o benchmarks/fixtures/mi_feed.xml URL
+
+Uso: python -m benchmarks.bench_feed_parser [repeticiones]
+"""
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import feedparser
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src import fast_parser  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+
+def measure(func, data, repeat):
+    """Devuelve (ms por llamada - mejor de 3 rondas, KiB de memoria pico)"""
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func(data)
+        best = min(best, (time.perf_counter() - started) / repeat)
+
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    parsers = [
+        ('feedparser', lambda d: feedparser.parse(d)),
+        ('fast', lambda d: fast_parser.parse(d)),
+        ('fast N=10', lambda d: fast_parser.parse(d, max_entries=10)),
+    ]
+
+    print("⏱️ BENCHMARK PARSER DE FEEDS")
+    print("=" * 72)
+    print(f"{'fixture':<24}{'parser':<12}{'ms/parse':>10}{'pico KiB':>10}{'speedup':>10}")
+    for path in sorted(FIXTURES.glob('*.xml')):
+        data = path.read_bytes()
+        baseline = None
+        for name, func in parsers:
+            ms, kib = measure(func, data, repeat)
+            baseline = baseline or ms
+            print(f"{path.stem:<24}{name:<12}{ms:>10.2f}{kib:>10.0f}{baseline / ms:>9.1f}x")
+        print("-" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark del saneado HTML de PromptInjectionGuard
+Compara _sanitize_html (un patrón de atributos sobre el texto original y un
+solo escape) con el recorrido clásico: escapar y después 12 patrones de tags
+y 5 de atributos sobre el texto escapado. Usa los textos de los YAML y de los
+feeds de benchmarks/fixtures, y resúmenes largos hechos uniendo los de los
+feeds. Antes de medir comprueba que ambos dan exactamente lo mismo; el pico
+de memoria (KiB, tracemalloc) es el de sanear un texto.
+
+Uso: python -m benchmarks.bench_html_sanitizer [repeticiones]
+"""
+import html
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from benchmarks.bench_security_scan import load_corpora  # noqa: E402
+from src.security_guard import PromptInjectionGuard  # noqa: E402
+
+LONG_SUMMARY_SIZE = 64 * 1024
+LONG_SUMMARY_COUNT = 4
+FEED_CORPORA = {path.stem for path in (Path(__file__).resolve().parent / 'fixtures').glob('*.xml')}
+
+_TAGS = ['script', 'iframe', 'object', 'embed', 'form', 'input']
+_ATTRS = ['onclick', 'onload', 'onerror', 'onmouseover', 'javascript:']
+_LEGACY_MARKUP = [
+    compiled
+    for tag in _TAGS
+    for compiled in (re.compile(f'<{tag}[^>]*>.*?</{tag}>', re.IGNORECASE | re.DOTALL),
+                     re.compile(f'<{tag}[^>]*/?>', re.IGNORECASE))
+] + [
+    re.compile(f'{attr}[^"\'\\s]*["\'][^"\']*["\']', re.IGNORECASE)
+    for attr in _ATTRS
+]
+
+
+def legacy_sanitize(guard, text):
+    """Referencia: escape y un re.sub por tag y por atributo, como hacía el guard antes"""
+    text = html.escape(text, quote=False)
+    for pattern in _LEGACY_MARKUP:
+        text = pattern.sub('', text)
+    return text
+
+
+def single_pass_sanitize(guard, text):
+    return guard._sanitize_html(text)
+
+
+def long_summaries(corpora):
+    """LONG_SUMMARY_COUNT resúmenes de 64 KiB uniendo todos los textos de los feeds"""
+    feed_texts = [text for name, texts in corpora.items() if name in FEED_CORPORA for text in texts]
+    joined = ' '.join(feed_texts) or 'Resumen <b>largo</b> & "citado"'
+    total = LONG_SUMMARY_SIZE * LONG_SUMMARY_COUNT
+    joined = (joined * (total // len(joined) + 1))[:total]
+    return [joined[start:start + LONG_SUMMARY_SIZE] for start in range(0, len(joined), LONG_SUMMARY_SIZE)]
+
+
+def measure(func, guard, texts, repeat):
+    """(ms por pasada completa del corpus, mejor de 3 rondas; KiB de pico de memoria)"""
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for text in texts:
+                func(guard, text)
+        best = min(best, (time.perf_counter() - started) / repeat)
+    peak = 0
+    for text in texts:
+        tracemalloc.start()
+        func(guard, text)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best * 1000, peak / 1024
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    guard = PromptInjectionGuard()
+    corpora = load_corpora()
+    corpora['resumenes_largos'] = long_summaries(corpora)
+
+    print("⏱️ BENCHMARK SANEADO HTML")
+    print("=" * 88)
+    print(f"{'corpus':<20}{'textos':>7}{'KiB':>7}{'clásico':>11}{'una pasada':>12}"
+          f"{'speedup':>9}{'pico ant.':>11}{'pico nuevo':>11}")
+    for name, texts in corpora.items():
+        for text in texts:
+            assert single_pass_sanitize(guard, text) == legacy_sanitize(guard, text), text[:80]
+        size = sum(len(text) for text in texts) / 1024
+        before, before_peak = measure(legacy_sanitize, guard, texts, repeat)
+        after, after_peak = measure(single_pass_sanitize, guard, texts, repeat)
+        print(f"{name:<20}{len(texts):>7}{size:>7.0f}{before:>9.2f}ms{after:>10.2f}ms"
+              f"{before / after:>8.1f}x{before_peak:>11.0f}{after_peak:>11.0f}")
+    print("-" * 88)
+
+
+if __name__ == "__main__":
+    main()
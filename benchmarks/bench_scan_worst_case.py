@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark de peor caso del escáner de PromptInjectionGuard
+Genera textos hostiles (fragmentos que hacen retroceder a las reglas,
+repetidos sin espacios ni cierres, y mezclas aleatorias de ellos) de hasta
+el doble de MAX_SCAN_CHARS y mide scan_content sobre cada uno. El
+presupuesto es un límite blando, así que comprueba que ningún escaneo pasa
+de SCAN_TIME_BUDGET más MARGIN: lo que no termina a tiempo se bloquea en
+vez de seguir escaneando.
+
+Uso: python -m benchmarks.bench_scan_worst_case [textos aleatorios] [semilla]
+"""
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from src import security_guard  # noqa: E402
+from src.security_guard import PromptInjectionGuard  # noqa: E402
+
+# Margen sobre el presupuesto: la etapa en curso al agotarse el plazo (el
+# escaneo de reglas lo comprueba cada DEADLINE_CHECK_EVERY coincidencias,
+# pero detectar y sanear las ya encontradas no se interrumpe)
+MARGIN = 0.1
+
+# Fragmentos que disparan el retroceso o muchas coincidencias de alguna regla
+HOSTILE_FRAGMENTS = [
+    "http://a", "https://x.", "<script", "</scrip", "onclick", "onload=\"", "javascript:'",
+    "' or '", "act as ", "print ", "urgent ", "{", "$(", "bash ", "jailbreak", "&", "İ",
+    "a" * 16, " ", "\n",
+]
+
+
+def hostile_texts(length):
+    """Cada fragmento repetido hasta length caracteres"""
+    return {f"{fragment.strip()[:12] or repr(fragment)} x{length}": (fragment * (length // len(fragment) + 1))[:length]
+            for fragment in HOSTILE_FRAGMENTS}
+
+
+def random_texts(count, length, seed):
+    """Mezclas aleatorias de fragmentos hostiles"""
+    rng = random.Random(seed)
+    texts = {}
+    for index in range(count):
+        parts = []
+        size = 0
+        while size < length:
+            part = rng.choice(HOSTILE_FRAGMENTS) * rng.randint(1, 200)
+            parts.append(part)
+            size += len(part)
+        texts[f"aleatorio {index}"] = ''.join(parts)[:length]
+    return texts
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    logging.getLogger('security').setLevel(logging.CRITICAL)
+    guard = PromptInjectionGuard()
+    limit = security_guard.SCAN_TIME_BUDGET + MARGIN
+
+    cases = {}
+    for length in (1024, security_guard.SCAN_WINDOW * 4, security_guard.MAX_SCAN_CHARS * 2):
+        cases.update(hostile_texts(length))
+    cases.update(random_texts(count, security_guard.MAX_SCAN_CHARS, seed))
+
+    print("⏱️ BENCHMARK PEOR CASO DEL ESCÁNER")
+    print("=" * 72)
+    print(f"{'texto':<28}{'KiB':>8}{'tiempo':>11}{'amenazas':>10}  veredicto")
+    worst = 0.0
+    for name, text in cases.items():
+        started = time.perf_counter()
+        is_safe, _, threats = guard.scan_content(text, 'rss_summary')
+        elapsed = time.perf_counter() - started
+        worst = max(worst, elapsed)
+        timed_out = any(threat.threat_type == 'scan_timeout' for threat in threats)
+        verdict = "⏳ bloqueado por tiempo" if timed_out else ("✅ seguro" if is_safe else "🚨 inseguro")
+        print(f"{name:<28}{len(text) / 1024:>8.0f}{elapsed * 1000:>9.0f}ms{len(threats):>10}  {verdict}")
+        assert elapsed <= limit, f"{name}: {elapsed:.2f}s > {limit:.2f}s"
+    print("-" * 72)
+    print(f"Peor caso: {worst * 1000:.0f}ms (límite {limit * 1000:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
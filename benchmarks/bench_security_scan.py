@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark del escáner de reglas de PromptInjectionGuard
+Compara el patrón combinado (una pasada por texto) con el recorrido clásico
+de un re.finditer por regla, sobre los textos de los YAML de contenido
+(tips, trends, automations, videos) y de los feeds de benchmarks/fixtures.
+Antes de medir comprueba que ambos encuentran exactamente lo mismo.
+
+Uso: python -m benchmarks.bench_security_scan [repeticiones]
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from src import fast_parser  # noqa: E402
+from src.security_guard import PromptInjectionGuard  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+YAML_POOLS = ['tips.yml', 'trends.yml', 'automations.yml', 'videos.yml']
+
+
+def _strings(node):
+    if isinstance(node, str):
+        yield node
+    elif isinstance(node, dict):
+        for value in node.values():
+            yield from _strings(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _strings(value)
+
+
+def load_corpora():
+    """{nombre: [textos]} con los pools YAML y los feeds grabados"""
+    corpora = {}
+    for name in YAML_POOLS:
+        path = ROOT / name
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                corpora[path.stem] = list(_strings(yaml.safe_load(f)))
+    for path in sorted(FIXTURES.glob('*.xml')):
+        feed = fast_parser.parse(path.read_bytes())
+        corpora[path.stem] = [entry.get(field, '') for entry in feed.entries
+                              for field in ('title', 'summary', 'link')]
+    return corpora
+
+
+def per_rule_scan(guard, text):
+    """Referencia: un re.finditer por regla, como hacía el guard antes"""
+    spans = []
+    for pattern in guard.injection_patterns:
+        spans += [(m.start(), m.end()) for m in re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE)]
+    for pattern in guard.suspicious_patterns:
+        spans += [(m.start(), m.end()) for m in re.finditer(pattern, text, re.IGNORECASE)]
+    return spans
+
+
+def combined_scan(guard, text):
+    return [(m.start, m.end) for m in guard._rule_scanner.finditer(text)]
+
+
+def measure(func, guard, texts, repeat):
+    """ms por pasada completa del corpus (mejor de 3 rondas)"""
+    best = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for text in texts:
+                func(guard, text)
+        best = min(best, (time.perf_counter() - started) / repeat)
+    return best * 1000
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    guard = PromptInjectionGuard()
+    corpora = load_corpora()
+
+    print("⏱️ BENCHMARK ESCÁNER DE SEGURIDAD")
+    print("=" * 72)
+    print(f"{'corpus':<22}{'textos':>8}{'KiB':>8}{'por regla':>12}{'combinado':>12}{'speedup':>10}")
+    for name, texts in corpora.items():
+        for text in texts:
+            assert combined_scan(guard, text) == per_rule_scan(guard, text), text[:80]
+        size = sum(len(text) for text in texts) / 1024
+        before = measure(per_rule_scan, guard, texts, repeat)
+        after = measure(combined_scan, guard, texts, repeat)
+        print(f"{name:<22}{len(texts):>8}{size:>8.0f}{before:>10.2f}ms{after:>10.2f}ms{before / after:>9.1f}x")
+    print("-" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Collector - Recolección adaptativa de feeds en segundo plano
+Consulta cada fuente según un intervalo propio que aprende de la frecuencia
+con la que publica, y guarda las noticias nuevas en el histórico local
+(StoryArchive). El envío diario lee el top 10 de ahí sin tocar la red.
+
+Uso:
+    python -m src.collector          # bucle continuo
+    python -m src.collector --once   # una pasada (p. ej. desde cron/Actions)
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.feed_cache import FeedCache, DEFAULT_CACHE_PATH
+from src.feed_fetcher import FeedFetcher, MAX_WORKERS, PER_HOST_LIMIT, FEED_TIMEOUT, NEWS_DEADLINE
+from src.feed_health import FeedHealth, DEFAULT_HEALTH_PATH
+from src.feeds_simple import load_feeds, _trusted_urls
+from src.simple_security import SimpleSecurityGuard
+from src.story import Story
+from src.story_archive import StoryArchive, DEFAULT_ARCHIVE_PATH, STORY_MAX_AGE
+from src.story_dedup import strip_tracking
+from src.top_k import to_epoch
+
+DEFAULT_SCHEDULE_PATH = ".cache/poll_schedule.json"
+
+DEFAULT_INTERVAL = 3600.0       # fuentes sin historial: cada hora
+MIN_INTERVAL = 15 * 60.0
+MAX_INTERVAL = 24 * 3600.0
+INTERVAL_SMOOTHING = 0.5        # peso de la nueva estimación frente a la anterior
+RECENT_ENTRIES = 10             # entradas usadas para estimar la frecuencia
+
+
+class PollSchedule:
+    """
+    Intervalo aprendido y próxima consulta de cada fuente, persistidos en disco
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_SCHEDULE_PATH):
+        self.path = path
+        self._sources: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._sources = data
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Calendario de consultas ilegible, se ignora: {e}")
+
+    def save(self):
+        """Escribe el calendario a disco de forma atómica"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._sources, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def interval(self, url: str) -> float:
+        with self._lock:
+            return self._sources.get(url, {}).get('interval', DEFAULT_INTERVAL)
+
+    def due(self, urls: List[str], now: float) -> List[str]:
+        """Fuentes a las que ya les toca consulta (las nuevas, siempre)"""
+        with self._lock:
+            return [url for url in urls if self._sources.get(url, {}).get('next_poll', 0) <= now]
+
+    def next_due(self, urls: List[str]) -> float:
+        """Momento de la próxima consulta pendiente"""
+        with self._lock:
+            return min((self._sources.get(url, {}).get('next_poll', 0) for url in urls), default=0)
+
+    def learn(self, url: str, timestamps: List[int], new_items: int, now: float) -> float:
+        """
+        Ajusta el intervalo de una fuente tras consultarla
+
+        Con fechas de publicación se apunta a la mitad del hueco mediano entre
+        entradas; sin ellas, se acorta si hubo novedades y se alarga si no.
+        """
+        previous = self.interval(url)
+        recent = sorted(timestamps, reverse=True)[:RECENT_ENTRIES]
+        gaps = [a - b for a, b in zip(recent, recent[1:]) if a > b]
+        if gaps:
+            target = statistics.median(gaps) / 2
+        else:
+            target = previous * (0.5 if new_items else 1.5)
+        interval = previous + INTERVAL_SMOOTHING * (target - previous)
+        interval = min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+        with self._lock:
+            self._sources[url] = {'interval': round(interval), 'next_poll': round(now + interval)}
+        return interval
+
+    def postpone(self, url: str, now: float):
+        """Tras un fallo se reintenta en el intervalo actual (el backoff lo pone FeedHealth)"""
+        interval = self.interval(url)
+        with self._lock:
+            self._sources[url] = {'interval': interval, 'next_poll': round(now + interval)}
+
+
+def _store_entries(archive: StoryArchive, guard: SimpleSecurityGuard, url: str, feed: Any,
+                   now: float) -> Tuple[int, List[int]]:
+    """Valida y guarda las entradas recientes de un feed; devuelve (nuevas, timestamps)"""
+    new_items = 0
+    timestamps = []
+    for position, entry in enumerate(getattr(feed, 'entries', [])):
+        published = entry.get('published_parsed', None)
+        timestamp = to_epoch(published, int(now))
+        if published:
+            timestamps.append(timestamp)
+        if timestamp < now - STORY_MAX_AGE:
+            continue
+        story = Story(title=entry.get('title', 'Sin título'),
+                      link=strip_tracking(entry.get('link', '')),
+                      source=url, timestamp=timestamp)
+        if archive.contains(story.link) or not guard.validate_content(story):
+            continue
+        if archive.add(story, position, now):
+            new_items += 1
+    return new_items, timestamps
+
+
+def collect_once(archive_path=DEFAULT_ARCHIVE_PATH, schedule_path=DEFAULT_SCHEDULE_PATH,
+                 cache_path=DEFAULT_CACHE_PATH, health_path=DEFAULT_HEALTH_PATH,
+                 max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT,
+                 timeout=FEED_TIMEOUT, deadline=NEWS_DEADLINE, sources=None, now=None):
+    """
+    Consulta las fuentes a las que les toca y guarda sus noticias nuevas
+
+    Returns:
+        (noticias nuevas, fuentes consultadas)
+    """
+    now = time.time() if now is None else now
+    guard = SimpleSecurityGuard()
+    archive = StoryArchive(archive_path)
+    schedule = PollSchedule(schedule_path)
+    cache = FeedCache(cache_path)
+    health = FeedHealth(health_path)
+
+    registry = sources if sources is not None else load_feeds()
+    urls = health.filter(schedule.due(_trusted_urls(registry, guard), now))
+    timeouts = registry.timeouts() if hasattr(registry, 'timeouts') else None
+
+    fetcher = FeedFetcher(max_workers=max_workers, per_host_limit=per_host_limit, cache=cache,
+                          timeout=timeout, deadline=deadline, timeouts=timeouts)
+    new_total = 0
+    fetched = 0
+    for _, result in fetcher.iter_fetch(urls):
+        health.record(result)
+        if result.error is not None:
+            print(f"❌ Error procesando {result.url}: {result.error}")
+            schedule.postpone(result.url, now)
+            continue
+        fetched += 1
+        new_items, timestamps = _store_entries(archive, guard, result.url, result.feed, now)
+        interval = schedule.learn(result.url, timestamps, new_items, now)
+        new_total += new_items
+        print(f"📡 {result.url}: {new_items} nuevas, próxima consulta en {interval / 60:.0f} min")
+
+    # Sin nada que consultar, o con alguna fuente al día, el histórico está
+    # actualizado aunque no haya noticias nuevas; si fallan todas, no
+    if fetched or not urls:
+        archive.mark_collected(now)
+    archive.close()
+    schedule.save()
+    cache.save()
+    health.save()
+    print(f"🗃️ Histórico: {new_total} noticias nuevas de {len(urls)} fuentes")
+    return new_total, len(urls)
+
+
+def run(**kwargs):
+    """Bucle del colector: duerme hasta la próxima fuente pendiente"""
+    registry = load_feeds()
+    while True:
+        collect_once(sources=registry, **kwargs)
+        schedule = PollSchedule(kwargs.get('schedule_path', DEFAULT_SCHEDULE_PATH))
+        wait = schedule.next_due(registry.urls) - time.time()
+        time.sleep(min(MAX_INTERVAL, max(60.0, wait)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recolector adaptativo de feeds RSS")
+    parser.add_argument('--once', action='store_true', help="una sola pasada y salir")
+    args = parser.parse_args()
+    if args.once:
+        collect_once()
+    else:
+        run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Domain Policy - Política de dominios compartida por todos los guards
+Listas de dominios permitidos y bloqueados compiladas una sola vez en
+conjuntos de sufijos. Un dominio de la lista cubre también sus subdominios
+(news.mit.edu entra por mit.edu, pero notmit.edu no), la lista de bloqueo
+manda sobre la de permitidos y cada veredicto se memoriza durante la
+ejecución, así que comprobar un host cuesta O(número de etiquetas).
+"""
+import urllib.parse
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
+ALLOW = 'allow'
+DENY = 'deny'
+
+MEMO_LIMIT = 4096   # hosts distintos memorizados antes de vaciar el memo
+
+
+def normalize_host(value: str) -> str:
+    """
+    Host en minúsculas a partir de una URL o de un dominio suelto:
+    sin esquema, credenciales, puerto ni punto final
+    """
+    value = (value or '').strip()
+    if '://' in value:
+        host = urllib.parse.urlsplit(value).hostname or ''
+    else:
+        host = value.split('/', 1)[0].rpartition('@')[2]
+        if not host.startswith('['):
+            host = host.split(':', 1)[0]
+    return host.lower().rstrip('.')
+
+
+class DomainPolicy:
+    """Listas de permitidos/bloqueados con semántica de subdominios"""
+
+    def __init__(self, allow: Iterable[str] = (), deny: Iterable[str] = ()):
+        self.allow = frozenset(filter(None, map(normalize_host, allow)))
+        self.deny = frozenset(filter(None, map(normalize_host, deny)))
+        self._memo: Dict[str, Optional[str]] = {}
+
+    def _lookup(self, host: str) -> Optional[str]:
+        """Recorre los sufijos del host, del más largo (el propio host) al TLD"""
+        allowed = False
+        suffix = host
+        while suffix:
+            if suffix in self.deny:
+                return DENY
+            if suffix in self.allow:
+                allowed = True
+            suffix = suffix.partition('.')[2]
+        return ALLOW if allowed else None
+
+    def verdict(self, value: str) -> Optional[str]:
+        """'deny', 'allow' o None (dominio desconocido) para una URL o un host"""
+        host = normalize_host(value)
+        try:
+            return self._memo[host]
+        except KeyError:
+            pass
+        if len(self._memo) >= MEMO_LIMIT:
+            self._memo.clear()
+        result = self._memo[host] = self._lookup(host) if host else None
+        return result
+
+    def is_allowed(self, value: str) -> bool:
+        return self.verdict(value) == ALLOW
+
+    def is_denied(self, value: str) -> bool:
+        return self.verdict(value) == DENY
+
+
+# Acotado, como compile_ruleset: cada recarga de reglas trae listas nuevas
+@lru_cache(maxsize=8)
+def _compiled(allow: frozenset, deny: frozenset) -> DomainPolicy:
+    return DomainPolicy(allow, deny)
+
+
+def get_policy(allow: Iterable[str] = (), deny: Iterable[str] = ()) -> DomainPolicy:
+    """Política compilada una vez por par de listas (de los últimos usados)"""
+    return _compiled(frozenset(allow), frozenset(deny))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Fast Parser - Parser ligero para feeds RSS 2.0, Atom y YouTube (videos.xml)
+Recorre el XML de forma incremental con ElementTree.iterparse, extrae solo
+título, enlace, resumen y fecha de publicación, y se detiene tras N entradas.
+Ante cualquier formato desconocido o XML inválido delega en feedparser.
+"""
+import email.utils
+import html
+import io
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import feedparser
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+MEDIA_NS = '{http://search.yahoo.com/mrss/}'
+
+# Tags de marcado dentro de títulos/resúmenes (el resultado es texto plano)
+_TAG_RE = re.compile(r'<[^>]*>')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class UnsupportedFeed(Exception):
+    """El documento no es RSS 2.0 ni Atom 1.0: hay que usar feedparser"""
+
+
+def _text(value: Optional[str]) -> str:
+    """Convierte un fragmento (posiblemente HTML) en texto plano normalizado"""
+    if not value:
+        return ''
+    if '<' in value:
+        value = _TAG_RE.sub(' ', value)
+    if '&' in value:
+        value = html.unescape(value)
+    return _SPACE_RE.sub(' ', value).strip()
+
+
+def _rfc822_to_struct(value: Optional[str]) -> Optional[time.struct_time]:
+    """Fecha RFC 822 (RSS pubDate) a struct_time UTC"""
+    if not value:
+        return None
+    parsed = email.utils.parsedate_tz(value.strip())
+    if parsed is None:
+        return None
+    try:
+        return time.gmtime(email.utils.mktime_tz(parsed))
+    except (OverflowError, ValueError):
+        return None
+
+
+def _iso8601_to_struct(value: Optional[str]) -> Optional[time.struct_time]:
+    """Fecha ISO 8601 (Atom published) a struct_time UTC"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.utctimetuple()
+
+
+def _rss_entry(item: ET.Element) -> Dict[str, Any]:
+    link = (item.findtext('link') or '').strip()
+    if not link:
+        guid = item.find('guid')
+        if guid is not None and guid.get('isPermaLink', 'true') != 'false':
+            link = (guid.text or '').strip()
+    published = item.findtext('pubDate')
+    return {
+        'title': _text(item.findtext('title')),
+        'link': link,
+        'summary': _text(item.findtext('description')),
+        'published': published,
+        'published_parsed': _rfc822_to_struct(published),
+    }
+
+
+def _atom_entry(entry: ET.Element) -> Dict[str, Any]:
+    link = ''
+    for candidate in entry.findall(f'{ATOM_NS}link'):
+        if candidate.get('rel', 'alternate') == 'alternate':
+            link = candidate.get('href', '')
+            break
+    summary = entry.findtext(f'{ATOM_NS}summary') or entry.findtext(f'{ATOM_NS}content')
+    if summary is None:
+        # YouTube guarda la descripción en media:group/media:description
+        summary = entry.findtext(f'{MEDIA_NS}group/{MEDIA_NS}description')
+    published = entry.findtext(f'{ATOM_NS}published')
+    return {
+        'title': _text(entry.findtext(f'{ATOM_NS}title')),
+        'link': link,
+        'summary': _text(summary),
+        'published': published,
+        'published_parsed': _iso8601_to_struct(published),
+    }
+
+
+def parse_fast(data: bytes, max_entries: Optional[int] = None) -> Any:
+    """
+    Parsea RSS 2.0 / Atom 1.0 sin feedparser
+
+    Raises:
+        UnsupportedFeed: formato desconocido (RSS 1.0/RDF, Atom 0.3, ...)
+        ET.ParseError: XML mal formado
+    """
+    entries = []
+    feed_title = ''
+    version = None
+    item_tag = None
+    depth = 0
+
+    for event, element in ET.iterparse(io.BytesIO(data), events=('start', 'end')):
+        if event == 'start':
+            if version is None:
+                if element.tag == 'rss':
+                    version, item_tag = 'rss20', 'item'
+                elif element.tag == f'{ATOM_NS}feed':
+                    version, item_tag = 'atom10', f'{ATOM_NS}entry'
+                else:
+                    raise UnsupportedFeed(element.tag)
+            if element.tag == item_tag:
+                depth += 1
+            continue
+
+        if element.tag == item_tag:
+            depth -= 1
+            build = _rss_entry if version == 'rss20' else _atom_entry
+            entries.append(feedparser.FeedParserDict(build(element)))
+            element.clear()
+            if max_entries is not None and len(entries) >= max_entries:
+                break
+        elif depth == 0 and element.tag in ('title', f'{ATOM_NS}title') and not feed_title:
+            feed_title = _text(element.text)
+
+    if version is None:
+        raise UnsupportedFeed('documento vacío')
+
+    return feedparser.FeedParserDict(
+        entries=entries,
+        feed=feedparser.FeedParserDict(title=feed_title),
+        version=version,
+        bozo=False,
+    )
+
+
+def parse(data: bytes, headers: Optional[Dict[str, str]] = None,
+          max_entries: Optional[int] = None) -> Any:
+    """Parser rápido con fallback a feedparser.parse"""
+    try:
+        return parse_fast(data, max_entries=max_entries)
+    except (UnsupportedFeed, ET.ParseError):
+        feed = feedparser.parse(data, response_headers=headers)
+        if max_entries is not None:
+            del feed.entries[max_entries:]
+        return feed
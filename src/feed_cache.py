@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Feed Cache - Caché HTTP condicional (ETag / Last-Modified) para feeds RSS
+Guarda en disco, por URL, los validadores HTTP y las últimas entradas
+parseadas para que un 304 Not Modified no requiera volver a descargar.
+Si el feed ya venía escaneado (ParseStage con scan=True), se recuerda para
+no volver a escanear ni sanear su texto tras un 304. Esas entradas ya
+saneadas van en un archivo aparte (scanned_cache_path) marcado con la
+versión de las reglas (variant): quien lee entradas crudas nunca las ve, y
+un cambio de reglas las invalida.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import feedparser
+
+DEFAULT_CACHE_PATH = ".cache/feeds.json"
+
+# Campos de cada entrada que se conservan en caché
+ENTRY_FIELDS = ('title', 'link', 'summary', 'published_parsed')
+
+
+def scanned_cache_path(path: Optional[str]) -> Optional[str]:
+    """Archivo de caché para las entradas ya escaneadas (.cache/feeds.scanned.json)"""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.scanned{ext}"
+
+
+class FeedCache:
+    """
+    Caché persistente de feeds indexada por URL
+
+    Con variant (la versión de las reglas con que se escanearon), solo se
+    usan las entradas guardadas con esa misma variante; sin ella, solo las
+    entradas crudas.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, variant: Optional[str] = None):
+        self.path = path
+        self.variant = variant
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = data
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Caché de feeds ilegible, se ignora: {e}")
+
+    def save(self):
+        """Escribe la caché a disco de forma atómica"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Cabeceras If-None-Match / If-Modified-Since para una URL cacheada"""
+        cached = self._usable(url)
+        if not cached:
+            return {}
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('modified'):
+            headers['If-Modified-Since'] = cached['modified']
+        return headers
+
+    def store(self, url: str, headers: Dict[str, str], feed: Any):
+        """Guarda validadores y entradas tras una descarga completa (200)"""
+        with self._lock:
+            self.stats['misses'] += 1
+            etag = headers.get('etag')
+            modified = headers.get('last-modified')
+            if not (etag or modified):
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = {
+                'etag': etag,
+                'modified': modified,
+                'fetched_at': int(time.time()),
+                'variant': self.variant,
+                'scanned': bool(feed.get('scanned')),
+                'entries': [_compact_entry(e) for e in getattr(feed, 'entries', [])],
+            }
+
+    def cached_feed(self, url: str) -> Any:
+        """Reconstruye el feed cacheado tras un 304 Not Modified"""
+        with self._lock:
+            self.stats['hits'] += 1
+        cached = self._usable(url) or {}
+        entries = [_expand_entry(e) for e in cached.get('entries', [])]
+        return feedparser.FeedParserDict(entries=entries, status=304, bozo=False,
+                                         scanned=cached.get('scanned', False), blocked=[],
+                                         feed=feedparser.FeedParserDict())
+
+    def _usable(self, url: str) -> Optional[Dict[str, Any]]:
+        """Entrada cacheada si es de esta variante (y cruda si no hay variante)"""
+        with self._lock:
+            cached = self._entries.get(url)
+        if not cached or cached.get('variant') != self.variant:
+            return None
+        if self.variant is None and cached.get('scanned'):
+            return None     # entradas saneadas de una versión anterior de la caché
+        return cached
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de aciertos/fallos de la caché"""
+        total = self.stats['hits'] + self.stats['misses']
+        return {
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses'],
+            'hit_rate': self.stats['hits'] / total if total else 0.0,
+            'cached_feeds': len(self._entries),
+        }
+
+    def report(self) -> str:
+        stats = self.get_stats()
+        return (f"🗄️ Caché de feeds: {stats['hits']} hits (304), {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate)")
+
+
+def _compact_entry(entry: Any) -> Dict[str, Any]:
+    compact = {}
+    for field in ENTRY_FIELDS:
+        value = entry.get(field)
+        if value is None:
+            continue
+        if field == 'published_parsed':
+            value = list(value)
+        compact[field] = value
+    return compact
+
+
+def _expand_entry(compact: Dict[str, Any]) -> Any:
+    entry = feedparser.FeedParserDict(compact)
+    if entry.get('published_parsed'):
+        entry['published_parsed'] = time.struct_time(tuple(entry['published_parsed']))
+    return entry
+
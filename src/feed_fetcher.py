@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Feed Fetcher - Descarga concurrente de feeds RSS
+Descarga los feeds con un pool acotado de workers (límite global y límite
+por host) y parsea cada feed en cuanto llega, solapando red y parseo.
+Incluye una variante asyncio que reutiliza conexiones keep-alive por host.
+Cada feed tiene un timeout propio y la etapa completa un deadline global:
+al vencer, se devuelven los feeds terminados y se registran los cortados.
+"""
+import asyncio
+import gzip
+import http.client
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import feedparser
+from feedparser.http import ACCEPT_HEADER
+
+from src import fast_parser
+from src.feed_cache import FeedCache
+
+# Valores por defecto del pool de descarga
+MAX_WORKERS = 8
+PER_HOST_LIMIT = 2
+MAX_REDIRECTS = 5
+FEED_TIMEOUT = 15.0     # segundos como máximo por feed
+NEWS_DEADLINE = 90.0    # segundos como máximo para toda la etapa de noticias
+CHUNK_SIZE = 64 * 1024
+MAX_ENTRIES_PER_FEED = 100
+
+USER_AGENT = f"cafe-con-ia/1.0 {feedparser.USER_AGENT}"
+
+
+class NotModified(Exception):
+    """El servidor respondió 304: el feed no cambió desde la última descarga"""
+
+
+class FeedTimeout(TimeoutError):
+    """Un feed superó su timeout o quedó fuera del deadline global"""
+
+
+class DeadlineCutOff(FeedTimeout):
+    """
+    El feed quedó fuera del deadline global de la etapa: no dice nada de su
+    salud (quizá ni empezó a descargarse), así que no cuenta como fallo
+    """
+
+
+@dataclass
+class FetchResult:
+    """Resultado de descargar y parsear un feed"""
+    url: str
+    feed: Any = None
+    error: Optional[Exception] = None
+    elapsed: float = 0.0    # segundos de descarga
+    size: int = 0           # bytes descargados (0 si fue un 304)
+
+
+REQUEST_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': ACCEPT_HEADER,
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+
+def download(url: str, timeout: Optional[float] = None,
+             extra_headers: Optional[Dict[str, str]] = None) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Descarga el contenido crudo de un feed
+
+    Returns:
+        (data: bytes, headers: Dict[str, str]) con cabeceras en minúsculas
+
+    Raises:
+        NotModified: si la petición condicional recibe un 304
+    """
+    started = time.monotonic()
+    request = urllib.request.Request(url, headers={**REQUEST_HEADERS, **(extra_headers or {})})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = _read_body(response, timeout, started)
+            headers = {k.lower(): v for k, v in response.headers.items()}
+            headers.setdefault('content-location', response.geturl())
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            raise NotModified(url) from None
+        raise
+
+    return _decode_body(data, headers), headers
+
+
+def _read_body(response: Any, timeout: Optional[float], started: float) -> bytes:
+    """
+    Lee el cuerpo por bloques aplicando el timeout total del feed
+    (el timeout del socket solo acota cada operación individual)
+    """
+    chunks = []
+    while True:
+        chunk = response.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise FeedTimeout(f"timeout de {timeout:g}s superado")
+    return b''.join(chunks)
+
+
+def _decode_body(data: bytes, headers: Dict[str, str]) -> bytes:
+    """Descomprime el cuerpo según Content-Encoding"""
+    encoding = headers.get('content-encoding', '').lower()
+    if encoding == 'gzip':
+        data = gzip.decompress(data)
+    elif encoding == 'deflate':
+        try:
+            data = zlib.decompress(data)
+        except zlib.error:
+            data = zlib.decompress(data, -zlib.MAX_WBITS)
+    headers.pop('content-encoding', None)
+
+    return data
+
+
+def parse_feed(data: bytes, headers: Dict[str, str]) -> Any:
+    """
+    Parsea bytes ya descargados: vía rápida para RSS 2.0/Atom y feedparser
+    para el resto; solo se conservan las primeras MAX_ENTRIES_PER_FEED entradas
+    """
+    return fast_parser.parse(data, headers, max_entries=MAX_ENTRIES_PER_FEED)
+
+
+def _report_cut_off(deadline: float, urls: List[str]):
+    """Registra los feeds que quedaron fuera del deadline global"""
+    print(f"⏱️ Deadline de {deadline:g}s alcanzado: {len(urls)} feeds cortados")
+    for url in urls:
+        print(f"   ⏱️ Cortado: {url}")
+
+
+class FeedFetcher:
+    """
+    Pool de descarga de feeds con límite de concurrencia global y por host
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, per_host_limit: int = PER_HOST_LIMIT,
+                 parser: Callable[[bytes, Dict[str, str]], Any] = parse_feed,
+                 cache: Optional[FeedCache] = None,
+                 timeout: Optional[float] = FEED_TIMEOUT, deadline: Optional[float] = None,
+                 timeouts: Optional[Dict[str, float]] = None):
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.parser = parser
+        self.cache = cache
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.deadline = deadline
+        self.cut_off: List[str] = []
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Semáforo que limita las descargas simultáneas contra un mismo host"""
+        host = urllib.parse.urlparse(url).netloc.lower()
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
+
+    def _download(self, url: str) -> Tuple[Optional[bytes], Dict[str, str], Optional[Exception], float, Any]:
+        """
+        Descarga en un worker; devuelve (data, headers, error, segundos, feed)
+        feed solo viene parseado si el parser es paralelo (ParseStage en modo
+        proceso); si no, se parsea en el hilo consumidor
+        """
+        extra_headers = self.cache.conditional_headers(url) if self.cache else None
+        with self._host_slot(url):
+            started = time.monotonic()
+            try:
+                data, headers = download(url, timeout=self.timeouts.get(url, self.timeout),
+                                         extra_headers=extra_headers)
+            except Exception as e:
+                return None, {}, e, time.monotonic() - started, None
+            elapsed = time.monotonic() - started
+        if not getattr(self.parser, 'parallel', False):
+            return data, headers, None, elapsed, None
+        try:
+            return data, headers, None, elapsed, self.parser(data, headers)
+        except Exception as e:
+            return data, headers, e, elapsed, None
+
+    def iter_fetch(self, urls: List[str]) -> Iterator[Tuple[int, FetchResult]]:
+        """
+        Descarga los feeds en paralelo y los parsea según van llegando
+
+        Yields:
+            (index, FetchResult) en orden de finalización; index es la
+            posición de la URL en la lista de entrada
+        """
+        self.cut_off = []
+        if not urls:
+            return
+
+        workers = min(self.max_workers, len(urls))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='feed-fetch')
+        futures = {pool.submit(self._download, url): index for index, url in enumerate(urls)}
+        pending = set(futures.values())
+        try:
+            # El parseo ocurre en este hilo mientras el pool sigue descargando
+            for future in as_completed(futures, timeout=self.deadline):
+                index = futures[future]
+                pending.discard(index)
+                url = urls[index]
+                data, headers, error, elapsed, feed = future.result()
+                try:
+                    if error is not None:
+                        raise error
+                    feed = _parse_and_cache(self, url, data, headers, feed)
+                    yield index, FetchResult(url, feed=feed, elapsed=elapsed, size=len(data))
+                except NotModified:
+                    yield index, FetchResult(url, feed=self.cache.cached_feed(url), elapsed=elapsed)
+                except Exception as e:
+                    yield index, FetchResult(url, error=e, elapsed=elapsed)
+        except FuturesTimeout:
+            self.cut_off = [urls[index] for index in sorted(pending)]
+            _report_cut_off(self.deadline, self.cut_off)
+            for index in sorted(pending):
+                yield index, FetchResult(urls[index], error=DeadlineCutOff("cortado por el deadline global"))
+        finally:
+            # No esperar a las descargas colgadas: su socket timeout las termina
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_all(self, urls: List[str]) -> List[FetchResult]:
+        """Descarga y parsea todos los feeds, devolviendo resultados en el orden de entrada"""
+        results: List[Optional[FetchResult]] = [None] * len(urls)
+        for index, result in self.iter_fetch(urls):
+            results[index] = result
+        return results
+
+
+def _parse_and_cache(fetcher: Any, url: str, data: bytes, headers: Dict[str, str],
+                     feed: Any = None) -> Any:
+    """Parsea una descarga completa (si no lo está ya) y actualiza la caché condicional"""
+    if feed is None:
+        feed = fetcher.parser(data, headers)
+    if fetcher.cache is not None:
+        fetcher.cache.store(url, headers, feed)
+    return feed
+
+
+class HostConnection:
+    """
+    Conexión HTTP/1.1 persistente (keep-alive) contra un único host
+    No es thread-safe: cada conexión la usa un solo worker a la vez
+    """
+
+    def __init__(self, scheme: str, netloc: str, timeout: Optional[float] = None):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._aborted = False
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._aborted:
+            raise DeadlineCutOff("descarga abortada por el deadline global")
+        if self._conn is None:
+            if self.scheme == 'https':
+                self._conn = http.client.HTTPSConnection(
+                    self.netloc, timeout=self.timeout, context=ssl.create_default_context()
+                )
+            else:
+                self._conn = http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def abort(self):
+        """Interrumpe desde otro hilo una lectura bloqueada en el socket"""
+        self._aborted = True
+        conn = self._conn
+        if conn is not None and conn.sock is not None:
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _request_once(self, target: str, extra_headers: Dict[str, str],
+                      timeout: Optional[float]) -> Tuple[int, Dict[str, str], bytes]:
+        started = time.monotonic()
+        conn = self._connect()
+        # El timeout puede variar por feed aunque la conexión se reutilice
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        try:
+            conn.request('GET', target, headers={**REQUEST_HEADERS, **extra_headers})
+            response = conn.getresponse()
+            # Leer el cuerpo completo es obligatorio para poder reutilizar la conexión
+            data = _read_body(response, timeout, started)
+        except BaseException:
+            # Una respuesta a medio leer deja la conexión inservible
+            self.close()
+            raise
+        headers = {k.lower(): v for k, v in response.getheaders()}
+        if response.will_close:
+            self.close()
+        return response.status, headers, data
+
+    def get(self, url: str, extra_headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[float] = None) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Descarga una URL de este host siguiendo redirecciones
+        (timeout=None usa el timeout de la conexión)
+        """
+        extra_headers = extra_headers or {}
+        timeout = self.timeout if timeout is None else timeout
+        for _ in range(MAX_REDIRECTS + 1):
+            parsed = urllib.parse.urlsplit(url)
+            if (parsed.scheme.lower(), parsed.netloc.lower()) != (self.scheme, self.netloc.lower()):
+                # Redirección a otro host: descarga independiente
+                return download(url, timeout=timeout, extra_headers=extra_headers)
+
+            target = urllib.parse.urlunsplit(('', '', parsed.path or '/', parsed.query, ''))
+            try:
+                status, headers, data = self._request_once(target, extra_headers, timeout)
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                # El servidor cerró la conexión keep-alive: reintentar con una nueva
+                self.close()
+                status, headers, data = self._request_once(target, extra_headers, timeout)
+
+            if status in (301, 302, 303, 307, 308) and 'location' in headers:
+                url = urllib.parse.urljoin(url, headers['location'])
+                continue
+            if status == 304:
+                raise NotModified(url)
+            if status >= 400:
+                raise http.client.HTTPException(f"HTTP Error {status} en {url}")
+
+            headers.setdefault('content-location', url)
+            return _decode_body(data, headers), headers
+
+        raise http.client.HTTPException(f"Demasiadas redirecciones en {url}")
+
+
+class AsyncFeedFetcher:
+    """
+    Descarga asyncio de feeds agrupando las URLs por host
+    Cada host tiene hasta per_host_limit conexiones keep-alive que se
+    reutilizan para todas sus URLs; el parseo corre en hilos worker.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, per_host_limit: int = PER_HOST_LIMIT,
+                 parser: Callable[[bytes, Dict[str, str]], Any] = parse_feed,
+                 cache: Optional[FeedCache] = None,
+                 timeout: Optional[float] = FEED_TIMEOUT, deadline: Optional[float] = None,
+                 timeouts: Optional[Dict[str, float]] = None):
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.parser = parser
+        self.cache = cache
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.deadline = deadline
+        self.cut_off: List[str] = []
+
+    async def _host_worker(self, connection: HostConnection, queue: "asyncio.Queue[int]",
+                           urls: List[str], done: "asyncio.Queue[Tuple[int, FetchResult]]",
+                           slots: asyncio.Semaphore):
+        try:
+            while True:
+                try:
+                    index = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                url = urls[index]
+                extra_headers = self.cache.conditional_headers(url) if self.cache else None
+                timeout = self.timeouts.get(url, self.timeout)
+                elapsed = 0.0
+                try:
+                    async with slots:
+                        started = time.monotonic()
+                        try:
+                            data, headers = await asyncio.to_thread(connection.get, url, extra_headers, timeout)
+                        finally:
+                            elapsed = time.monotonic() - started
+                    feed = await asyncio.to_thread(_parse_and_cache, self, url, data, headers)
+                    result = FetchResult(url, feed=feed, elapsed=elapsed, size=len(data))
+                except NotModified:
+                    result = FetchResult(url, feed=self.cache.cached_feed(url), elapsed=elapsed)
+                except Exception as e:
+                    result = FetchResult(url, error=e, elapsed=elapsed)
+                done.put_nowait((index, result))
+        except asyncio.CancelledError:
+            # Deadline global: liberar el hilo que sigue bloqueado en la descarga
+            connection.abort()
+            raise
+        finally:
+            connection.close()
+
+    async def iter_fetch(self, urls: List[str]) -> AsyncIterator[Tuple[int, FetchResult]]:
+        """
+        Descarga y parsea los feeds, entregándolos según van terminando
+
+        Yields:
+            (index, FetchResult) en orden de finalización; index es la
+            posición de la URL en la lista de entrada
+        """
+        self.cut_off = []
+        if not urls:
+            return
+
+        slots = asyncio.Semaphore(self.max_workers)
+        done: "asyncio.Queue[Tuple[int, FetchResult]]" = asyncio.Queue()
+
+        # Agrupar por host para reutilizar conexiones
+        by_host: Dict[Tuple[str, str], "asyncio.Queue[int]"] = {}
+        for index, url in enumerate(urls):
+            parsed = urllib.parse.urlsplit(url)
+            key = (parsed.scheme.lower(), parsed.netloc.lower())
+            by_host.setdefault(key, asyncio.Queue()).put_nowait(index)
+
+        tasks = []
+        for (scheme, netloc), queue in by_host.items():
+            for _ in range(min(self.per_host_limit, queue.qsize())):
+                connection = HostConnection(scheme, netloc, timeout=self.timeout)
+                tasks.append(asyncio.create_task(self._host_worker(connection, queue, urls, done, slots)))
+
+        loop = asyncio.get_running_loop()
+        deadline_at = None if self.deadline is None else loop.time() + self.deadline
+        pending = set(range(len(urls)))
+        try:
+            while pending:
+                remaining = None if deadline_at is None else deadline_at - loop.time()
+                try:
+                    index, result = await asyncio.wait_for(done.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                pending.discard(index)
+                yield index, result
+
+            if pending:
+                self.cut_off = [urls[index] for index in sorted(pending)]
+                _report_cut_off(self.deadline, self.cut_off)
+                for index in sorted(pending):
+                    yield index, FetchResult(urls[index], error=DeadlineCutOff("cortado por el deadline global"))
+        finally:
+            # Cancelar cierra las conexiones y aborta las descargas en curso
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def fetch_all(self, urls: List[str]) -> List[FetchResult]:
+        """Descarga y parsea todos los feeds, devolviendo resultados en el orden de entrada"""
+        results: List[Optional[FetchResult]] = [None] * len(urls)
+        async for index, result in self.iter_fetch(urls):
+            results[index] = result
+        return results
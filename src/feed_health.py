@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Feed Health - Salud por fuente RSS y circuit breaker
+Guarda en disco, por URL, latencia, racha de fallos, bytes y entradas de
+cada descarga. Tras FAILURE_THRESHOLD fallos seguidos el circuito se abre y
+el feed deja de descargarse; se vuelve a probar pasado un backoff que se
+duplica con cada nuevo fallo (hasta MAX_BACKOFF). Los feeds cortados por el
+deadline global (DeadlineCutOff) no se registran: ni éxito ni fallo.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.feed_fetcher import DeadlineCutOff
+
+DEFAULT_HEALTH_PATH = ".cache/feed_health.json"
+
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF = 36 * 3600        # con ejecución diaria: salta al menos un día
+MAX_BACKOFF = 14 * 24 * 3600
+LATENCY_SMOOTHING = 0.3         # peso de la última medida en la latencia media
+
+
+class FeedHealth:
+    """
+    Estadísticas persistentes de salud de los feeds indexadas por URL
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_HEALTH_PATH):
+        self.path = path
+        self._feeds: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.skipped: List[str] = []
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._feeds = data
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Estado de salud de feeds ilegible, se ignora: {e}")
+
+    def save(self):
+        """Escribe las estadísticas a disco de forma atómica"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._feeds, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def stats(self, url: str) -> Dict[str, Any]:
+        """Estadísticas de una fuente (vacías si nunca se descargó)"""
+        with self._lock:
+            return dict(self._feeds.get(url, {}))
+
+    def allow(self, url: str, now: Optional[float] = None) -> bool:
+        """Indica si el circuito del feed está cerrado o toca volver a probarlo"""
+        now = time.time() if now is None else now
+        with self._lock:
+            open_until = self._feeds.get(url, {}).get('open_until')
+        return not open_until or now >= open_until
+
+    def filter(self, urls: List[str], now: Optional[float] = None) -> List[str]:
+        """URLs que se pueden descargar; el resto se registra en self.skipped"""
+        allowed = []
+        self.skipped = []
+        for url in urls:
+            if self.allow(url, now):
+                allowed.append(url)
+            else:
+                self.skipped.append(url)
+                print(f"🔌 Feed en pausa por fallos repetidos: {url}")
+        return allowed
+
+    def record_success(self, url: str, latency: float, size: int, entries: int,
+                       now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self._feeds.setdefault(url, {})
+            previous = stats.get('latency')
+            stats['latency'] = round(latency if previous is None else
+                                     previous + LATENCY_SMOOTHING * (latency - previous), 3)
+            stats['failure_streak'] = 0
+            stats['successes'] = stats.get('successes', 0) + 1
+            stats['bytes'] = size
+            stats['entries'] = entries
+            stats['last_success'] = int(now)
+            stats.pop('open_until', None)
+            stats.pop('last_error', None)
+
+    def record_failure(self, url: str, error: Exception, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            stats = self._feeds.setdefault(url, {})
+            streak = stats.get('failure_streak', 0) + 1
+            stats['failure_streak'] = streak
+            stats['failures'] = stats.get('failures', 0) + 1
+            stats['last_error'] = f"{type(error).__name__}: {error}"[:200]
+            stats['last_failure'] = int(now)
+            if streak >= FAILURE_THRESHOLD:
+                backoff = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (streak - FAILURE_THRESHOLD))
+                stats['open_until'] = int(now + backoff)
+
+    def record(self, result: Any, now: Optional[float] = None):
+        """Registra un FetchResult del fetcher"""
+        if isinstance(result.error, DeadlineCutOff):
+            return      # la etapa se quedó sin tiempo, no es culpa del feed
+        if result.error is not None:
+            self.record_failure(result.url, result.error, now)
+            return
+        entries = len(getattr(result.feed, 'entries', []))
+        if not entries and result.feed.get('bozo'):
+            # Respuesta 200 que no es un feed (página de error, HTML, ...)
+            error = result.feed.get('bozo_exception') or ValueError("feed sin entradas")
+            self.record_failure(result.url, error, now)
+            return
+        self.record_success(result.url, result.elapsed, result.size, entries, now)
+
+    def report(self) -> str:
+        with self._lock:
+            failing = sum(1 for s in self._feeds.values() if s.get('failure_streak'))
+            open_circuits = sum(1 for s in self._feeds.values() if s.get('open_until'))
+        return (f"🩺 Salud de feeds: {len(self.skipped)} omitidos, {failing} con fallos recientes, "
+                f"{open_circuits} circuitos abiertos")
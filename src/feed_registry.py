@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Feed Registry - Registro canónico de fuentes RSS
+Carga rss_sources.yml, canonicaliza las URLs y elimina fuentes duplicadas
+antes de cualquier descarga. Acepta el formato clásico (lista de URLs) y un
+esquema compacto con metadatos por fuente:
+
+    defaults: {lang: en, timeout: 15}
+    sources:
+      - https://techcrunch.com/category/ai/feed
+      - {url: https://www.xataka.com/tag/inteligencia-artificial/rss2.xml, lang: es}
+      - url: https://venturebeat.com/ai/feed/
+        weight: 1.5
+        aliases: [https://venturebeat.com/category/ai/feed]
+"""
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import yaml
+
+DEFAULT_SOURCES_PATH = "rss_sources.yml"
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_SOURCE_FIELDS = ('lang', 'weight', 'timeout')
+
+
+def canonical_url(url: str) -> str:
+    """
+    Forma canónica de una URL de feed para detectar duplicados:
+    esquema https, host en minúsculas sin 'www.' ni puerto por defecto,
+    sin fragmento y sin barra final en la ruta
+    """
+    parsed = urllib.parse.urlsplit(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parsed.port and parsed.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    path = parsed.path.rstrip('/')
+    if scheme in _DEFAULT_PORTS:
+        scheme = 'https'
+    return urllib.parse.urlunsplit((scheme, host, path, parsed.query, ''))
+
+
+@dataclass
+class FeedSource:
+    """Una fuente RSS con sus metadatos"""
+    url: str
+    lang: Optional[str] = None
+    weight: float = 1.0
+    timeout: Optional[float] = None
+    aliases: Tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def key(self) -> str:
+        return canonical_url(self.url)
+
+
+class SourceRegistry:
+    """
+    Conjunto ordenado de fuentes únicas
+    Al iterarlo produce URLs, igual que la lista que devolvía load_feeds()
+    """
+
+    def __init__(self, sources: Optional[List[FeedSource]] = None):
+        self.sources: List[FeedSource] = []
+        self.duplicates: List[Tuple[str, str]] = []
+        self._by_key: Dict[str, FeedSource] = {}
+        for source in sources or []:
+            self.add(source)
+
+    def add(self, source: FeedSource) -> bool:
+        """Añade una fuente; devuelve False si duplica otra ya registrada"""
+        existing = self._by_key.get(source.key)
+        if existing is not None:
+            self.duplicates.append((source.url, existing.url))
+            return False
+        self.sources.append(source)
+        self._by_key[source.key] = source
+        for alias in source.aliases:
+            self._by_key.setdefault(canonical_url(alias), source)
+        return True
+
+    def get(self, url: str) -> Optional[FeedSource]:
+        """Fuente registrada para una URL (con cualquier grafía equivalente)"""
+        return self._by_key.get(canonical_url(url))
+
+    @property
+    def urls(self) -> List[str]:
+        return [source.url for source in self.sources]
+
+    def timeouts(self) -> Dict[str, float]:
+        """Timeouts por URL de las fuentes que definen uno propio"""
+        return {s.url: s.timeout for s in self.sources if s.timeout is not None}
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.urls)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+
+def _parse_source(entry: Any, defaults: Dict[str, Any]) -> FeedSource:
+    if isinstance(entry, str):
+        entry = {'url': entry}
+    if not isinstance(entry, dict) or not entry.get('url'):
+        raise ValueError(f"Fuente RSS inválida: {entry!r}")
+    values = {k: entry.get(k, defaults.get(k)) for k in _SOURCE_FIELDS}
+    return FeedSource(
+        url=str(entry['url']).strip(),
+        lang=values['lang'],
+        weight=float(values['weight']) if values['weight'] is not None else 1.0,
+        timeout=float(values['timeout']) if values['timeout'] is not None else None,
+        aliases=tuple(entry.get('aliases') or ()),
+    )
+
+
+def build_registry(data: Any) -> SourceRegistry:
+    """Construye el registro a partir del YAML ya cargado (lista o esquema compacto)"""
+    defaults: Dict[str, Any] = {}
+    entries = data or []
+    if isinstance(data, dict):
+        defaults = data.get('defaults') or {}
+        entries = data.get('sources') or []
+
+    registry = SourceRegistry()
+    for entry in entries:
+        registry.add(_parse_source(entry, defaults))
+    return registry
+
+
+def load_registry(path: str = DEFAULT_SOURCES_PATH) -> SourceRegistry:
+    """Carga y deduplica las fuentes RSS del archivo de configuración"""
+    with open(path, "r", encoding="utf-8") as f:
+        registry = build_registry(yaml.safe_load(f))
+    for duplicate, kept in registry.duplicates:
+        print(f"♻️ Fuente duplicada omitida: {duplicate} (= {kept})")
+    return registry
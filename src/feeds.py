@@ -1,83 +1,161 @@
-import feedparser, datetime, yaml
+import feedparser, time, yaml
+from dataclasses import replace
 from src.simple_security import SimpleSecurityGuard
+from src.rss_security import RSSSecurityMonitor
+from src.feed_fetcher import FeedFetcher, MAX_WORKERS, PER_HOST_LIMIT, FEED_TIMEOUT, NEWS_DEADLINE
+from src.feed_cache import FeedCache, DEFAULT_CACHE_PATH, scanned_cache_path
+from src.feed_health import FeedHealth, DEFAULT_HEALTH_PATH
+from src.scan_cache import ScanCache, DEFAULT_SCAN_CACHE_PATH
+from src.top_k import to_epoch
+from src.story_dedup import DedupTopK, strip_tracking
+from src.feed_registry import load_registry
+from src.parse_pool import ParseStage, DEFAULT_PARSE_MODE
+from src.story import Story, excerpt
+
+SUMMARY_LIMIT = 180     # caracteres del resumen en el newsletter
 
 def load_feeds(path="rss_sources.yml"):
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    """Registro de fuentes sin duplicados (iterable de URLs, como la lista del YAML)"""
+    return load_registry(path)
+
+def push_feed(top, security_monitor, index, url, feed, now):
+    """
+    Lleva al top las noticias seguras de un feed: solo se escanean las que
+    podrían entrar, y entran con la misma clave (index, posición en el feed)
+    con la que se comprobó que cabían
+    """
+    # Solo se validan las entradas que podrían entrar en el top 10
+    positions = []
+    feed_stories = []
+    for position, entry in enumerate(feed.entries):
+        published_ts = to_epoch(entry.get('published_parsed'), now)
+        title = entry.get('title', '')
+        link = strip_tracking(entry.get('link', ''))
+        if not top.accepts(published_ts, (index, position), title, link):
+            continue
+        positions.append(position)
+        feed_stories.append(Story(
+            title=title,
+            link=link,
+            summary=entry.get('summary', '') or entry.get('description', ''),
+            source=url,
+            timestamp=published_ts,
+            scanned=bool(feed.get('scanned'))
+        ))
+
+    # Aplicar filtrado de seguridad al contenido (ya hecho si se
+    # escaneó en el pool de procesos)
+    if feed.get('scanned'):
+        safe_stories = feed_stories
+        for title in feed.blocked:
+            print(f"🚨 RSS: Entrada maliciosa descartada: {title}...")
+        security_monitor.validation_stats['threats_blocked'] += len(feed.blocked)
+        security_monitor.validation_stats['total_processed'] += len(feed.entries) + len(feed.blocked)
+    else:
+        safe_stories = security_monitor.scan_each(feed_stories)
+
+    for position, story in zip(positions, safe_stories):
+        if story is not None:
+            top.push(story.timestamp, story, (index, position), story.title, story.link)
 
-def top10():
+def final_pass(stories, security_guard, limit=SUMMARY_LIMIT):
+    """
+    Recorta los resúmenes y escanea lo que aún no se haya escaneado
+
+    Las noticias escaneadas ya traen veredicto y texto saneado (escapado):
+    su extracto es un prefijo de ese texto, cortado fuera de las entidades
+    HTML, así que no se vuelve a escanear. Reescanearlo lo trataría como
+    texto nuevo y el & de un &lt; bastaría para descartar la noticia.
+    """
+    finalists = [replace(story, summary=excerpt(story.summary, limit)) for story in stories]
+    recheck = [i for i, story in enumerate(finalists) if not story.scanned]
+    unsafe = set()
+    if recheck:
+        final_fields = ('title', 'link', 'summary')
+        scans = security_guard.scan_many(
+            [finalists[i] for i in recheck], final_fields, {field: f'final_{field}' for field in final_fields})
+        for i, scanned in zip(recheck, scans):
+            if not all(scanned[field].is_safe for field in final_fields):
+                unsafe.add(i)
+            else:
+                finalists[i] = replace(finalists[i], title=scanned['title'].sanitized,
+                                       link=scanned['link'].sanitized,
+                                       summary=scanned['summary'].sanitized, scanned=True)
+    return [story for i, story in enumerate(finalists) if i not in unsafe]
+
+def top10(max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, cache_path=DEFAULT_CACHE_PATH,
+          timeout=FEED_TIMEOUT, deadline=NEWS_DEADLINE, health_path=DEFAULT_HEALTH_PATH,
+          parse_mode=DEFAULT_PARSE_MODE, parse_workers=None, scan_cache_path=DEFAULT_SCAN_CACHE_PATH):
     """
     Obtiene las top 10 noticias con validación de seguridad integrada
+
+    Con parse_mode='process' el parseo y el escaneo de seguridad de cada feed
+    se reparten en un pool de parse_workers procesos (por defecto, uno por
+    núcleo); con 'inline' se escanean solo los candidatos al top 10. Cada
+    texto se escanea una sola vez: las noticias llevan su veredicto y su
+    texto saneado hasta el final, y los veredictos se reutilizan entre
+    ejecuciones (scan_cache_path).
     """
     # 🔒 Inicializar monitor de seguridad
-    security_monitor = RSSSecurityMonitor()
+    scan_cache = ScanCache(scan_cache_path)
+    security_monitor = RSSSecurityMonitor(scan_cache)
+    if parse_mode == 'process':
+        # El pool devuelve entradas saneadas: caché aparte, válida solo con estas reglas
+        cache = FeedCache(scanned_cache_path(cache_path), variant=security_monitor.security_guard.ruleset_version)
+    else:
+        cache = FeedCache(cache_path)
+    health = FeedHealth(health_path)
     
-    urls = load_feeds()
-    items = []
+    registry = load_feeds()
     
     print("🔍 Procesando feeds RSS con validación de seguridad...")
     
-    for url in urls:
-        try:
-            # Validar fuente RSS antes de procesarla
-            validation_result = security_monitor.validate_rss_source(url)
-            
-            if not validation_result['is_safe']:
-                print(f"🚨 Fuente RSS bloqueada por seguridad: {url}")
-                continue
-            
-            # Procesar feed si es seguro
-            feed = feedparser.parse(url)
-            
-            # Validar contenido del feed
-            feed_items = []
-            for entry in feed.entries:
-                feed_items.append({
-                    'title': getattr(entry, 'title', ''),
-                    'description': getattr(entry, 'summary', '') or getattr(entry, 'description', ''),
-                    'link': getattr(entry, 'link', ''),
-                    'published_parsed': getattr(entry, 'published_parsed', None)
-                })
-            
-            # Aplicar filtrado de seguridad al contenido
-            safe_items = security_monitor.scan_rss_feed_content(feed_items)
-            
-            # Convertir de vuelta al formato original
-            for safe_item, original_entry in zip(safe_items, feed.entries):
-                original_entry.title = safe_item['title']
-                original_entry.summary = safe_item['description']
-                original_entry.link = safe_item['link']
-                items.append(original_entry)
-                
-        except Exception as e:
-            print(f"⚠️  Error procesando feed {url}: {e}")
+    # Validar fuentes RSS antes de descargarlas
+    safe_urls = []
+    for url in registry:
+        validation_result = security_monitor.validate_rss_source(url)
+        
+        if not validation_result['is_safe']:
+            print(f"🚨 Fuente RSS bloqueada por seguridad: {url}")
             continue
+        safe_urls.append(url)
+    # Omitir temporalmente los feeds con fallos repetidos (circuit breaker)
+    safe_urls = health.filter(safe_urls)
     
-    # fallback fecha
-    for e in items:
-        if not e.get('published_parsed'):
-            e.published_parsed = datetime.datetime.utcnow().timetuple()
+    # Descargar los feeds seguros en paralelo (con caché condicional);
+    # cada feed se procesa en cuanto termina y solo se retiene el top 10,
+    # sin la misma noticia repetida por varios medios
+    with ParseStage(parse_mode, parse_workers, scan=(parse_mode == 'process')) as parser:
+        fetcher = FeedFetcher(max_workers=max_workers, per_host_limit=per_host_limit, parser=parser,
+                               cache=cache, timeout=timeout, deadline=deadline, timeouts=registry.timeouts())
+        top = DedupTopK(10)
+        # Las entradas sin fecha cuentan como "ahora", calculado una sola vez
+        now = int(time.time())
     
-    items = sorted(items, key=lambda e: e.published_parsed, reverse=True)[:10]
+        for index, result in fetcher.iter_fetch(safe_urls):
+            url = result.url
+            health.record(result)
+            try:
+                if result.error is not None:
+                    raise result.error
+                feed = result.feed
+            
+                push_feed(top, security_monitor, index, url, feed, now)
+                
+            except Exception as e:
+                print(f"⚠️  Error procesando feed {url}: {e}")
+                continue
     
-    result = []
-    for e in items:
-        # Validación final de seguridad para cada item
-        title = getattr(e, 'title', '')
-        link = getattr(e, 'link', '')
-        summary = (getattr(e, 'summary', '') or getattr(e, 'description', ''))[:180] + "…"
-        
-        # Escaneo final de seguridad
-        is_title_safe, safe_title, _ = security_monitor.security_guard.scan_content(title, 'final_title')
-        is_link_safe, safe_link, _ = security_monitor.security_guard.scan_content(link, 'final_link')
-        is_summary_safe, safe_summary, _ = security_monitor.security_guard.scan_content(summary, 'final_summary')
-        
-        if is_title_safe and is_link_safe and is_summary_safe:
-            result.append({
-                "title": safe_title,
-                "link": safe_link,
-                "summary": safe_summary
-            })
+    cache.save()
+    health.save()
+    print(cache.report())
+    print(health.report())
+    if top.duplicates:
+        print(f"🧬 {top.duplicates} noticias duplicadas descartadas")
+    
+    result = final_pass(top.items(), security_monitor.security_guard)
     
+    scan_cache.save()
+    print(scan_cache.report())
     print(f"✅ Feeds procesados: {len(result)} noticias seguras seleccionadas")
     return result
\ No newline at end of file
@@ -1,50 +1,200 @@
-import feedparser, datetime, yaml
+import feedparser, time, yaml
 from src.simple_security import SimpleSecurityGuard
+from src.feed_fetcher import FeedFetcher, AsyncFeedFetcher, MAX_WORKERS, PER_HOST_LIMIT, FEED_TIMEOUT, NEWS_DEADLINE
+from src.feed_cache import FeedCache, DEFAULT_CACHE_PATH
+from src.feed_health import FeedHealth, DEFAULT_HEALTH_PATH
+from src.top_k import to_epoch
+from src.story_dedup import DedupTopK, strip_tracking
+from src.feed_registry import load_registry
+from src.story_archive import StoryArchive, DEFAULT_ARCHIVE_PATH
+from src.parse_pool import ParseStage, DEFAULT_PARSE_MODE
+from src.story import Story
+
+# El histórico solo sustituye a la descarga si el colector lo actualizó en este margen
+ARCHIVE_MAX_STALENESS = 6 * 3600
 
 def load_feeds(path="rss_sources.yml"):
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    """Registro de fuentes sin duplicados (iterable de URLs, como la lista del YAML)"""
+    return load_registry(path)
+
+def _trusted_urls(urls, guard):
+    """Filtra las URLs que no son de dominios confiables antes de descargar"""
+    safe_urls = []
+    for url in urls:
+        if not guard.is_safe_url(url):
+            print(f"⚠️ URL no confiable omitida: {url}")
+            continue
+        safe_urls.append(url)
+    return safe_urls
 
-def top10():
+def _save_state(cache, health, archive):
+    """Persiste caché, salud de los feeds e histórico y muestra su resumen"""
+    cache.save()
+    health.save()
+    if archive is not None:
+        archive.close()
+    print(cache.report())
+    print(health.report())
+
+class _NewsSelector:
     """
-    Obtiene las top 10 noticias con validación de seguridad básica
+    Valida las entradas de cada feed según llega y conserva solo las 10 más
+    recientes, descartando la misma noticia publicada por varios medios.
+    Con histórico, guarda cada noticia validada y omite las ya enviadas.
     """
-    urls = load_feeds()
-    guard = SimpleSecurityGuard()
-    items = []
     
-    print("🔍 Procesando feeds RSS...")
+    def __init__(self, guard, k=10, archive=None):
+        self.guard = guard
+        self.archive = archive
+        self.top = DedupTopK(k)
+        # Las entradas sin fecha cuentan como "ahora", calculado una sola vez
+        self.now = int(time.time())
     
-    for url in urls:
+    def add(self, index, result):
+        url = result.url
         try:
-            # Validar que la URL sea de un dominio confiable
-            if not guard.is_safe_url(url):
-                print(f"⚠️ URL no confiable omitida: {url}")
-                continue
+            if result.error is not None:
+                raise result.error
                 
             print(f"📡 Procesando: {url}")
-            feed = feedparser.parse(url)
+            feed = result.feed
             
             if hasattr(feed, 'entries'):
-                for entry in feed.entries:
-                    # Crear item básico
-                    item = {
-                        'title': entry.get('title', 'Sin título'),
-                        'link': entry.get('link', ''),
-                        'published': entry.get('published_parsed', None)
-                    }
+                for position, entry in enumerate(feed.entries):
+                    published = entry.get('published_parsed', None)
+                    timestamp = to_epoch(published, self.now)
+                    order = (index, position)
+                    title = entry.get('title', 'Sin título')
+                    link = strip_tracking(entry.get('link', ''))
+                    # Descartar sin validar lo que no puede entrar en el top
+                    # o es un duplicado de una noticia más reciente
+                    if not self.top.accepts(timestamp, order, title, link):
+                        continue
+                    if self.archive is not None and self.archive.was_sent(link):
+                        continue
+                    
+                    # Crear noticia básica
+                    story = Story(title=title, link=link, source=url, timestamp=timestamp)
                     
                     # Validar contenido básico
-                    if guard.validate_content(item):
-                        items.append(item)
+                    if self.guard.validate_content(story):
+                        if self.archive is not None:
+                            self.archive.add(story, position)
+                        self.top.push(timestamp, story, order, title, link)
                         
         except Exception as e:
             print(f"❌ Error procesando {url}: {e}")
-            continue
     
-    # Ordenar por fecha y tomar top 10
-    items.sort(key=lambda x: x.get('published') or datetime.datetime.now().timetuple(), reverse=True)
-    top_items = items[:10]
+    def result(self):
+        top_items = self.top.items()
+        if self.top.duplicates:
+            print(f"🧬 {self.top.duplicates} noticias duplicadas descartadas")
+        print(f"✅ {len(top_items)} noticias procesadas y validadas")
+        return top_items
+
+def top10(max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, cache_path=DEFAULT_CACHE_PATH,
+          timeout=FEED_TIMEOUT, deadline=NEWS_DEADLINE, health_path=DEFAULT_HEALTH_PATH,
+          archive_path=DEFAULT_ARCHIVE_PATH, parse_mode=DEFAULT_PARSE_MODE, parse_workers=None):
+    """
+    Obtiene las top 10 noticias con validación de seguridad básica
+
+    Args:
+        max_workers: Descargas simultáneas como máximo
+        per_host_limit: Descargas simultáneas como máximo contra un mismo host
+        cache_path: Archivo de la caché condicional de feeds (None la desactiva)
+        timeout: Segundos como máximo por feed
+        deadline: Segundos como máximo para toda la etapa; al vencer se usan
+            los feeds terminados hasta ese momento
+        health_path: Archivo con la salud de cada feed (None la desactiva);
+            los feeds con fallos repetidos se omiten temporalmente
+        archive_path: Histórico SQLite de noticias (None lo desactiva); las
+            noticias validadas se guardan y las ya enviadas se omiten
+        parse_mode: 'inline' parsea en este proceso; 'process' reparte el
+            parseo en un pool de procesos (variable CAFE_PARSE_MODE)
+        parse_workers: Procesos del pool (por defecto, uno por núcleo)
+    """
+    guard = SimpleSecurityGuard()
+    cache = FeedCache(cache_path)
+    health = FeedHealth(health_path)
+    archive = StoryArchive(archive_path) if archive_path else None
+    
+    print("🔍 Procesando feeds RSS...")
+    registry = load_feeds()
+    safe_urls = health.filter(_trusted_urls(registry, guard))
+    
+    # Descarga concurrente; cada feed se procesa en cuanto termina
+    with ParseStage(parse_mode, parse_workers) as parser:
+        fetcher = FeedFetcher(max_workers=max_workers, per_host_limit=per_host_limit, parser=parser,
+                               cache=cache, timeout=timeout, deadline=deadline, timeouts=registry.timeouts())
+        selector = _NewsSelector(guard, archive=archive)
+        for index, result in fetcher.iter_fetch(safe_urls):
+            health.record(result)
+            selector.add(index, result)
+    _save_state(cache, health, archive)
+    return selector.result()
+
+async def top10_async(max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, cache_path=DEFAULT_CACHE_PATH,
+                      timeout=FEED_TIMEOUT, deadline=NEWS_DEADLINE, health_path=DEFAULT_HEALTH_PATH,
+          archive_path=DEFAULT_ARCHIVE_PATH, parse_mode=DEFAULT_PARSE_MODE, parse_workers=None):
+    """
+    Variante asyncio de top10(): reutiliza conexiones keep-alive por host
+    y parsea los feeds en hilos worker
+    """
+    guard = SimpleSecurityGuard()
+    cache = FeedCache(cache_path)
+    health = FeedHealth(health_path)
+    archive = StoryArchive(archive_path) if archive_path else None
     
-    print(f"✅ {len(top_items)} noticias procesadas y validadas")
+    print("🔍 Procesando feeds RSS (asyncio)...")
+    registry = load_feeds()
+    safe_urls = health.filter(_trusted_urls(registry, guard))
+    
+    with ParseStage(parse_mode, parse_workers) as parser:
+        fetcher = AsyncFeedFetcher(max_workers=max_workers, per_host_limit=per_host_limit, parser=parser,
+                                   cache=cache, timeout=timeout, deadline=deadline,
+                                   timeouts=registry.timeouts())
+        selector = _NewsSelector(guard, archive=archive)
+        async for index, result in fetcher.iter_fetch(safe_urls):
+            health.record(result)
+            selector.add(index, result)
+    _save_state(cache, health, archive)
+    return selector.result()
+
+def top10_from_archive(archive_path=DEFAULT_ARCHIVE_PATH, max_staleness=ARCHIVE_MAX_STALENESS, k=10,
+                       candidates=50):
+    """
+    Top 10 leído del histórico que mantiene el colector (src/collector.py),
+    sin descargas: una consulta indexada de las noticias no enviadas más
+    recientes, deduplicadas entre medios. Devuelve [] si el histórico no
+    existe o está desactualizado.
+    """
+    archive = StoryArchive(archive_path)
+    try:
+        last_collected = archive.last_collected()
+        if last_collected is None or time.time() - last_collected > max_staleness:
+            print("🗃️ Histórico de noticias vacío o desactualizado")
+            return []
+        rows = archive.newest(max(k, candidates))
+    finally:
+        archive.close()
+    
+    # A igual fecha, desempatar por el orden de las fuentes en rss_sources.yml
+    # y la posición en su feed; la posición se repite entre pasadas del
+    # colector, así que el orden de la consulta cierra el desempate
+    source_order = {url: index for index, url in enumerate(load_feeds())}
+    top = DedupTopK(k)
+    for rank, (position, story) in enumerate(rows):
+        order = (source_order.get(story.source, len(source_order)), position, rank)
+        top.push(story.timestamp, story, order, story.title, story.link)
+    
+    top_items = top.items()
+    print(f"✅ {len(top_items)} noticias leídas del histórico")
     return top_items
+
+def mark_sent(stories, archive_path=DEFAULT_ARCHIVE_PATH):
+    """Registra en el histórico las noticias de la edición enviada"""
+    archive = StoryArchive(archive_path)
+    try:
+        archive.mark_sent(story.link for story in stories)
+    finally:
+        archive.close()
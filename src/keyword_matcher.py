@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher - Búsqueda de muchas palabras clave a la vez (Aho-Corasick)
+Construye una sola vez el autómata de todas las palabras y encuentra todas
+sus apariciones en una pasada lineal por el texto, sin importar cuántas
+palabras haya. Así se pueden cargar listas de bloqueo grandes (miles de
+términos) sin que el escaneo se frene.
+"""
+import re
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class KeywordMatcher:
+    """
+    Autómata Aho-Corasick sobre una lista de palabras (sin distinguir
+    mayúsculas); las coincidencias pueden solaparse, como con `in`
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+        self._lengths: List[int] = []
+        seen: Dict[str, int] = {}
+        for keyword in keywords:
+            term = keyword.lower()
+            if not term or term in seen:
+                continue
+            seen[term] = len(self.keywords)
+            self.keywords.append(keyword)
+            self._lengths.append(len(term))
+            self._insert(term, seen[term])
+        self._link()
+        # Desde la raíz solo merece la pena parar donde empieza alguna palabra
+        # (sus dos primeros caracteres): el resto del texto se salta en C
+        starts = []
+        for char, state in sorted(self._goto[0].items()):
+            seconds = ''.join(sorted(self._goto[state]))
+            if self._out[state] or not seconds:
+                starts.append(re.escape(char))
+            else:
+                starts.append(f"{re.escape(char)}[{re.escape(seconds)}]")
+        self._starts = re.compile(f"(?={'|'.join(starts)})") if starts else None
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def _insert(self, term: str, index: int):
+        state = 0
+        for char in term:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = following
+        self._out[state] += (index,)
+
+    def _link(self):
+        """Enlaces de fallo en anchura; cada estado hereda las salidas de su fallo"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, following in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[following] = self._goto[fallback].get(char, 0)
+                self._out[following] += self._out[self._fail[following]]
+                queue.append(following)
+
+    def finditer(self, text: str) -> List[Tuple[int, int, int]]:
+        """
+        (índice de palabra, inicio, fin) de cada aparición, en orden de fin;
+        las posiciones son sobre text
+        """
+        found = []
+        if not text or self._starts is None:
+            return found
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Algún carácter cambia de longitud al pasar a minúsculas (p. ej.
+            # 'İ'): se usa su primer carácter para conservar las posiciones
+            lowered = ''.join(char.lower()[0] for char in text)
+        text = lowered
+        state = 0
+        position = 0
+        length = len(text)
+        while position < length:
+            if state == 0:
+                candidate = self._starts.search(text, position)
+                if candidate is None:
+                    break
+                position = candidate.start()
+            char = text[position]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            position += 1
+            for index in out[state]:
+                found.append((index, position - lengths[index], position))
+        return found
+
+    def matched(self, text: str) -> Set[int]:
+        """Índices de las palabras que aparecen en el texto"""
+        return {index for index, _, _ in self.finditer(text)}
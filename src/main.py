@@ -1,8 +1,9 @@
-import os, json, smtplib, ssl, datetime
+import os, json, smtplib, ssl, datetime, asyncio
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from jinja2 import Template
-from src.feeds_simple import top10  # nuestro módulo simplificado
+from src.feeds_simple import top10_async, top10_from_archive, mark_sent  # nuestro módulo simplificado
+from src.feed_registry import load_registry
 from src.content_rotator_simple import ContentRotator  # Sistema de rotación simplificado
 from src.simple_security import validate_environment, secure_content  # Seguridad básica
 
@@ -34,7 +35,6 @@ if __name__ == "__main__":
         exit(1)
     
     try:
-        import yaml
         print("DEBUG: GMAIL_USER =", repr(GMAIL_USER), flush=True)
         print(f"DEBUG: GMAIL_PASS raw repr: {repr(GMAIL_PASS)}", flush=True)
         if GMAIL_PASS:
@@ -47,15 +47,15 @@ if __name__ == "__main__":
             print("DEBUG: GMAIL_PASS is set: False", flush=True)
         print("DEBUG: RECIPIENTS =", repr(RECIPIENTS), flush=True)
         # Mostrar feeds cargados
-        with open("rss_sources.yml", "r", encoding="utf-8") as f:
-            feeds = yaml.safe_load(f)
+        feeds = load_registry("rss_sources.yml").urls
         print(f"DEBUG feeds loaded ({len(feeds)}):", feeds, flush=True)
 
-        stories = top10()
+        # Noticias del colector si está al día; si no, descarga en frío
+        stories = top10_from_archive() or asyncio.run(top10_async())
         print(f"DEBUG stories count: {len(stories) if stories else 0}", flush=True)
         if stories:
             for idx, s in enumerate(stories):
-                print(f"Story {idx+1}: {json.dumps(s, ensure_ascii=False, indent=2)}", flush=True)
+                print(f"Story {idx+1}: {json.dumps(s.to_dict(), ensure_ascii=False, indent=2)}", flush=True)
         else:
             print("DEBUG stories: No stories found.", flush=True)
 
@@ -91,7 +91,7 @@ if __name__ == "__main__":
             date=date
         )
         text = f"Café con IA – {date}\n" + \
-               "\n".join(f"- {s['title']}: {s['link']}" for s in stories) + \
+               "\n".join(f"- {s.title}: {s.link}" for s in stories) + \
                "\n\nTips:\n" + "\n".join(f"- {tip['title']}: {tip['link']}" for tip in tips) + \
                "\n\nTendencias:\n" + "\n".join(f"- {trend['title']}: {trend['link']}" for trend in trends) + \
                "\n\nAutomatización:\n" + "\n".join(f"- {auto['title']}: {auto['link']}" for auto in automations) + \
@@ -100,6 +100,7 @@ if __name__ == "__main__":
         print("DEBUG: GMAIL_USER =", GMAIL_USER, flush=True)
         print("DEBUG: GMAIL_PASS length =", len(GMAIL_PASS) if GMAIL_PASS else 0, flush=True)
         send(html, text)
+        mark_sent(stories[:10])
     except Exception as e:
         import traceback
         print("ERROR:", e, flush=True)
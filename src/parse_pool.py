@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Parse Pool - Parseo y escaneo de seguridad de feeds en varios núcleos
+Sin red de por medio, el coste del pipeline es CPU: parsear el XML y pasar
+las expresiones regulares de PromptInjectionGuard. ParseStage ejecuta ambas
+cosas en línea o en un pool de procesos y devuelve registros compactos y
+serializables (Story) en lugar de FeedParserDict.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import fast_parser
+from src.feed_fetcher import MAX_ENTRIES_PER_FEED
+from src.story import Story
+from src.top_k import to_epoch
+
+PARSE_MODES = ('inline', 'process')
+DEFAULT_PARSE_MODE = os.getenv('CAFE_PARSE_MODE', 'inline')
+
+
+def worker_context():
+    """
+    Contexto multiprocessing de los pools: nunca fork, porque los pools se
+    alimentan desde los hilos de descarga y un fork desde un proceso con
+    hilos puede heredar locks tomados (logging, SSL, semáforos) y colgarse
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+@dataclass
+class ParsedFeed:
+    """Feed parseado (y opcionalmente escaneado) listo para seleccionar"""
+    entries: List[Story] = field(default_factory=list)
+    scanned: bool = False
+    blocked: List[str] = field(default_factory=list)    # títulos descartados
+    bozo: bool = False
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default)
+
+
+# Guard por proceso: compilar los patrones una sola vez por worker (y
+# recargarlos si cambia el archivo de reglas mientras el pool sigue vivo)
+_guard = None
+
+
+def _worker_guard():
+    global _guard
+    if _guard is None:
+        from src.security_guard import PromptInjectionGuard
+        _guard = PromptInjectionGuard()
+    else:
+        _guard.reload_rules()
+    return _guard
+
+
+def _scan_story(guard: Any, story: Story) -> Tuple[bool, Story]:
+    """Escanea título, resumen y enlace; devuelve (es_seguro, noticia saneada)"""
+    safe_title, title, _ = guard.scan_content(story.title, 'rss_title')
+    safe_summary, summary, _ = guard.scan_content(story.summary, 'rss_description')
+    safe_link, link, _ = guard.scan_content(story.link, 'rss_link')
+    sanitized = replace(story, title=title, summary=summary, link=link, scanned=True)
+    return safe_title and safe_summary and safe_link, sanitized
+
+
+def parse_and_scan(data: bytes, headers: Optional[Dict[str, str]] = None,
+                   max_entries: Optional[int] = None, scan: bool = False) -> ParsedFeed:
+    """Parsea bytes crudos de un feed y, si se pide, escanea sus entradas"""
+    feed = fast_parser.parse(data, headers, max_entries=max_entries)
+    records = [
+        Story(
+            title=entry.get('title', ''),
+            link=entry.get('link', ''),
+            summary=entry.get('summary', '') or entry.get('description', ''),
+            timestamp=to_epoch(entry.get('published_parsed'), 0),
+        )
+        for entry in feed.entries
+    ]
+
+    parsed = ParsedFeed(bozo=bool(feed.get('bozo')) and not records)
+    if not scan:
+        parsed.entries = records
+        return parsed
+
+    guard = _worker_guard()
+    parsed.scanned = True
+    for record in records:
+        is_safe, sanitized = _scan_story(guard, record)
+        if is_safe:
+            parsed.entries.append(sanitized)
+        else:
+            parsed.blocked.append(record.title[:50])
+    return parsed
+
+
+class ParseStage:
+    """
+    Parser intercambiable con el de FeedFetcher/AsyncFeedFetcher
+
+    mode='inline' parsea en el hilo que lo llama; mode='process' reparte el
+    trabajo en un ProcessPoolExecutor de `workers` procesos (por defecto,
+    uno por núcleo). Los fetchers llaman al stage desde varios hilos, así que
+    en modo proceso varios feeds se parsean a la vez.
+    """
+
+    def __init__(self, mode: str = DEFAULT_PARSE_MODE, workers: Optional[int] = None,
+                 scan: bool = False, max_entries: Optional[int] = MAX_ENTRIES_PER_FEED):
+        if mode not in PARSE_MODES:
+            raise ValueError(f"Modo de parseo desconocido: {mode} (usa {', '.join(PARSE_MODES)})")
+        self.mode = mode
+        self.scan = scan
+        self.max_entries = max_entries
+        self._pool = (ProcessPoolExecutor(max_workers=workers, mp_context=worker_context())
+                      if mode == 'process' else None)
+
+    @property
+    def parallel(self) -> bool:
+        """Indica si conviene llamarlo desde los hilos de descarga"""
+        return self._pool is not None
+
+    def __call__(self, data: bytes, headers: Optional[Dict[str, str]] = None) -> ParsedFeed:
+        if self._pool is None:
+            return parse_and_scan(data, headers, self.max_entries, self.scan)
+        return self._pool.submit(parse_and_scan, data, headers, self.max_entries, self.scan).result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
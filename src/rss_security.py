@@ -8,7 +8,22 @@ import hashlib
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import urllib.parse
+from collections import Counter, deque
+from dataclasses import replace
 from src.security_guard import PromptInjectionGuard
+from src.scan_cache import ScanCache
+from src.domain_policy import get_policy, DENY, ALLOW
+from src.story import Story
+
+
+# Campos escaneados de cada item RSS y su tipo de contenido
+RSS_FIELDS = ('title', 'description', 'link')
+STORY_FIELDS = ('title', 'summary', 'link')
+RSS_CONTENT_TYPES = {'title': 'rss_title', 'description': 'rss_description',
+                     'summary': 'rss_description', 'link': 'rss_link'}
+
+# Items en cuarentena que se conservan para revisión (el resto solo cuenta)
+QUARANTINE_LOG_SIZE = 100
 
 
 class RSSSecurityMonitor:
@@ -16,10 +31,12 @@ class RSSSecurityMonitor:
     Monitorea la seguridad de las fuentes RSS y valida el contenido entrante
     """
     
-    def __init__(self):
-        self.security_guard = PromptInjectionGuard()
+    def __init__(self, scan_cache: Optional[ScanCache] = None):
+        self.security_guard = PromptInjectionGuard(scan_cache)
         self.trusted_domains = self._setup_trusted_domains()
-        self.quarantine_log = []
+        self.domain_policy = get_policy(self.trusted_domains, self.security_guard.malicious_domains)
+        self.quarantine_log = deque(maxlen=QUARANTINE_LOG_SIZE)
+        self.quarantine_counts = Counter()
         self.validation_stats = {
             'total_processed': 0,
             'threats_blocked': 0,
@@ -27,6 +44,13 @@ class RSSSecurityMonitor:
             'last_scan': None
         }
     
+    def reload_rules(self) -> bool:
+        """Recarga las reglas del guard si su archivo cambió (y la política de dominios con ellas)"""
+        if not self.security_guard.reload_rules():
+            return False
+        self.domain_policy = get_policy(self.trusted_domains, self.security_guard.malicious_domains)
+        return True
+    
     def _setup_trusted_domains(self) -> List[str]:
         """Lista de dominios confiables para fuentes RSS"""
         return [
@@ -80,8 +104,17 @@ class RSSSecurityMonitor:
                 })
                 return validation_result
             
-            # Verificar dominio confiable
-            is_trusted = any(trusted in domain for trusted in self.trusted_domains)
+            # Verificar dominio confiable (bloqueados primero, luego permitidos)
+            verdict = self.domain_policy.verdict(parsed_url.hostname or '')
+            if verdict == DENY:
+                validation_result['trust_level'] = 'blocked'
+                validation_result['threats'].append({
+                    'type': 'blocked_domain',
+                    'severity': 'high',
+                    'description': f'Dominio en lista de bloqueo: {domain}'
+                })
+                return validation_result
+            is_trusted = verdict == ALLOW
             if is_trusted:
                 validation_result['trust_level'] = 'high'
                 validation_result['is_safe'] = True
@@ -135,16 +168,15 @@ class RSSSecurityMonitor:
         Escanea el contenido de un feed RSS en busca de amenazas
         """
         safe_items = []
+        results = self.security_guard.scan_many(feed_items, RSS_FIELDS, RSS_CONTENT_TYPES)
         
-        for item in feed_items:
+        for item, scanned in zip(feed_items, results):
             is_item_safe = True
             sanitized_item = item.copy()
             
             # Validar título
             if 'title' in item:
-                is_safe, sanitized_title, threats = self.security_guard.scan_content(
-                    item['title'], 'rss_title'
-                )
+                is_safe, sanitized_title, threats = scanned['title']
                 if not is_safe:
                     print(f"🚨 RSS: Título malicioso detectado: {item['title'][:50]}...")
                     is_item_safe = False
@@ -152,9 +184,7 @@ class RSSSecurityMonitor:
             
             # Validar descripción/resumen
             if 'description' in item:
-                is_safe, sanitized_desc, threats = self.security_guard.scan_content(
-                    item['description'], 'rss_description'
-                )
+                is_safe, sanitized_desc, threats = scanned['description']
                 if not is_safe:
                     print(f"🚨 RSS: Descripción maliciosa detectada en: {item.get('title', 'Sin título')}")
                     is_item_safe = False
@@ -162,9 +192,7 @@ class RSSSecurityMonitor:
             
             # Validar enlaces
             if 'link' in item:
-                is_safe, sanitized_link, threats = self.security_guard.scan_content(
-                    item['link'], 'rss_link'
-                )
+                is_safe, sanitized_link, threats = scanned['link']
                 if not is_safe:
                     print(f"🚨 RSS: Enlace malicioso detectado: {item['link']}")
                     is_item_safe = False
@@ -172,12 +200,7 @@ class RSSSecurityMonitor:
             
             # Agregar a cuarentena si es peligroso
             if not is_item_safe:
-                self.quarantine_log.append({
-                    'timestamp': datetime.now().isoformat(),
-                    'item': item,
-                    'reason': 'security_threat_detected'
-                })
-                self.validation_stats['threats_blocked'] += 1
+                self._quarantine(item)
             else:
                 safe_items.append(sanitized_item)
             
@@ -186,11 +209,55 @@ class RSSSecurityMonitor:
         self.validation_stats['last_scan'] = datetime.now().isoformat()
         return safe_items
     
+    def scan_stories(self, stories: List[Story]) -> List[Story]:
+        """
+        Igual que scan_rss_feed_content pero sobre registros Story: devuelve
+        las noticias seguras con título, resumen y enlace saneados
+        """
+        return [story for story in self.scan_each(stories) if story is not None]
+    
+    def scan_each(self, stories: List[Story]) -> List[Optional[Story]]:
+        """Como scan_stories, pero alineado con la entrada: None en cada noticia descartada"""
+        safe_stories = []
+        results = self.security_guard.scan_many(stories, STORY_FIELDS, RSS_CONTENT_TYPES)
+        
+        for story, scanned in zip(stories, results):
+            is_title_safe, title, _ = scanned['title']
+            if not is_title_safe:
+                print(f"🚨 RSS: Título malicioso detectado: {story.title[:50]}...")
+            is_summary_safe, summary, _ = scanned['summary']
+            if not is_summary_safe:
+                print(f"🚨 RSS: Descripción maliciosa detectada en: {story.title or 'Sin título'}")
+            is_link_safe, link, _ = scanned['link']
+            if not is_link_safe:
+                print(f"🚨 RSS: Enlace malicioso detectado: {story.link}")
+            
+            if is_title_safe and is_summary_safe and is_link_safe:
+                safe_stories.append(replace(story, title=title, summary=summary, link=link, scanned=True))
+            else:
+                safe_stories.append(None)
+                self._quarantine(story.to_dict())
+            
+            self.validation_stats['total_processed'] += 1
+        
+        self.validation_stats['last_scan'] = datetime.now().isoformat()
+        return safe_stories
+    
+    def _quarantine(self, item: Dict[str, Any], reason: str = 'security_threat_detected'):
+        """Pone un item en cuarentena (historial acotado) y lo cuenta"""
+        self.quarantine_log.append({
+            'timestamp': datetime.now().isoformat(),
+            'item': item,
+            'reason': reason
+        })
+        self.quarantine_counts[reason] += 1
+        self.validation_stats['threats_blocked'] += 1
+    
     def validate_rss_sources_file(self, sources_file_path: str) -> Dict[str, Any]:
         """
         Valida todas las fuentes RSS en el archivo de configuración
         """
-        import yaml
+        from src.feed_registry import load_registry
         
         validation_report = {
             'total_sources': 0,
@@ -201,8 +268,7 @@ class RSSSecurityMonitor:
         }
         
         try:
-            with open(sources_file_path, 'r', encoding='utf-8') as f:
-                sources = yaml.safe_load(f)
+            sources = load_registry(sources_file_path)
             
             if not sources:
                 return validation_report
@@ -250,10 +316,22 @@ class RSSSecurityMonitor:
         report.append(f"  • Último escaneo: {self.validation_stats['last_scan'] or 'Nunca'}")
         report.append("")
         
+        # Amenazas por tipo y severidad (contadores del guard)
+        guard_report = self.security_guard.get_security_report()
+        if guard_report['total_threats']:
+            report.append("🧮 AMENAZAS DETECTADAS:")
+            for threat_type, count in sorted(guard_report['threats_by_type'].items(), key=lambda kv: -kv[1]):
+                report.append(f"  • {threat_type}: {count}")
+            severities = ", ".join(f"{severity}: {count}" for severity, count
+                                   in sorted(guard_report['threats_by_severity'].items()))
+            report.append(f"  • Por severidad: {severities}")
+            report.append("")
+        
         # Items en cuarentena
         if self.quarantine_log:
-            report.append("🚨 ITEMS EN CUARENTENA:")
-            recent_quarantine = self.quarantine_log[-5:]  # Últimos 5
+            total = sum(self.quarantine_counts.values())
+            report.append(f"🚨 ITEMS EN CUARENTENA: {total} (se conservan los últimos {len(self.quarantine_log)})")
+            recent_quarantine = list(self.quarantine_log)[-5:]  # Últimos 5
             for item in recent_quarantine:
                 title = item['item'].get('title', 'Sin título')[:50]
                 report.append(f"  • {item['timestamp']}: {title}...")
@@ -270,7 +348,7 @@ class RSSSecurityMonitor:
     
     def get_quarantine_items(self, limit: int = 10) -> List[Dict]:
         """Obtiene items en cuarentena para revisión manual"""
-        return self.quarantine_log[-limit:] if self.quarantine_log else []
+        return list(self.quarantine_log)[-limit:] if self.quarantine_log else []
     
     def clear_quarantine(self) -> int:
         """Limpia la cuarentena y retorna cantidad de items removidos"""
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Rule Scanner - Escaneo de muchas expresiones regulares en una sola pasada
+Compila un conjunto de reglas en un único patrón con un grupo con nombre por
+regla. Cada coincidencia del patrón marca una posición donde empieza al menos
+una regla; en esa posición un lookahead por regla captura lo mismo que
+devolvería re.finditer de esa regla, y descartando solapes por regla se
+obtienen exactamente las mismas coincidencias que con un finditer por patrón.
+
+finditer_many() escanea un lote de textos unidos por un separador en una
+sola pasada y reparte las coincidencias; los textos que alguna coincidencia
+desborda se vuelven a escanear por separado, así que el resultado es el
+mismo que escaneando texto a texto.
+
+Con window, finditer() recorre los textos largos por ventanas solapadas sin
+copiarlos (pos/endpos de re): ninguna regla ve más de window caracteres, lo
+que acota el peor caso de los patrones con retroceso, y entre ventana y
+ventana (y cada DEADLINE_CHECK_EVERY coincidencias dentro de una ventana
+con muchas) se comprueba el plazo (deadline) para no pasarse de tiempo.
+"""
+import re
+import time
+from bisect import bisect_right
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:     # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# Flags que admiten los grupos con flags locales (?imsx:...)
+_SCOPED_FLAGS = {'i': re.IGNORECASE, 'm': re.MULTILINE, 's': re.DOTALL, 'x': re.VERBOSE}
+_INLINE_FLAGS = re.compile(r'^\(\?([imsx]+)\)')
+_WORD_CATEGORIES = (sre_constants.CATEGORY_WORD, sre_constants.CATEGORY_DIGIT)
+
+# Separador de lotes: ninguna regla actual lo atraviesa (\s no casa \x00 y
+# . no casa \n); si alguna lo hace, el texto afectado se reescanea solo
+BATCH_SEPARATOR = "\n\x00\n"
+
+# Anclas que se comportan igual dentro de un lote que en un texto suelto
+_JOIN_SAFE_ANCHORS = (sre_constants.AT_BOUNDARY, sre_constants.AT_NON_BOUNDARY)
+_LINE_ANCHORS = (sre_constants.AT_BEGINNING, sre_constants.AT_END)
+
+# Coincidencias entre comprobaciones del plazo dentro de una ventana
+DEADLINE_CHECK_EVERY = 256
+
+
+class ScanTimeout(TimeoutError):
+    """El escaneo por ventanas agotó su plazo antes de terminar el texto"""
+
+
+class RuleMatch(NamedTuple):
+    """Coincidencia de la regla `rule` (índice en el conjunto) en text[start:end]"""
+    rule: int
+    start: int
+    end: int
+
+
+def _split_flags(pattern: str, flags: int) -> Tuple[str, int]:
+    """Quita los flags globales en línea, (?i) al inicio, y los suma a flags"""
+    inline = _INLINE_FLAGS.match(pattern)
+    if not inline:
+        return pattern, flags
+    for letter in inline.group(1):
+        flags |= _SCOPED_FLAGS[letter]
+    return pattern[inline.end():], flags
+
+
+def _scoped(body: str, flags: int) -> str:
+    """Envuelve el patrón en un grupo con sus propios flags, para combinarlo"""
+    enabled = ''.join(letter for letter, flag in _SCOPED_FLAGS.items() if flags & flag)
+    disabled = ''.join(letter for letter in 'ims' if letter not in enabled)
+    return f"(?{enabled}-{disabled}:{body})" if disabled else f"(?{enabled}:{body})"
+
+
+def _is_word_char(code: int) -> bool:
+    char = chr(code)
+    return char.isalnum() or char == '_'
+
+
+def _starts_with_word(items) -> Optional[bool]:
+    """
+    True si toda coincidencia empieza por un carácter de palabra, False si
+    puede empezar por otro, None si puede ser vacía (decide lo que siga)
+    """
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            return _is_word_char(av)
+        if op is sre_constants.IN:
+            return all(
+                (kind is sre_constants.LITERAL and _is_word_char(value))
+                or (kind is sre_constants.RANGE and value[1] - value[0] < 256
+                    and all(_is_word_char(code) for code in range(value[0], value[1] + 1)))
+                or (kind is sre_constants.CATEGORY and value in _WORD_CATEGORIES)
+                for kind, value in av
+            )
+        if op is sre_constants.SUBPATTERN:
+            result = _starts_with_word(av[-1])
+        elif op is sre_constants.BRANCH:
+            results = [_starts_with_word(branch) for branch in av[1]]
+            result = False if False in results else (None if None in results else True)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            result = _starts_with_word(av[2])
+            if av[0] == 0 and result is not False:
+                result = None
+        elif op is sre_constants.AT:
+            result = None
+        else:
+            return False
+        if result is not None:
+            return result
+    return None
+
+
+def _joinable(items, multiline: bool) -> bool:
+    """
+    Indica si la regla da lo mismo sobre textos unidos por BATCH_SEPARATOR:
+    sin lookarounds ni anclas de inicio/fin de cadena (^ y $ solo en modo
+    MULTILINE, donde el separador las reproduce)
+    """
+    for op, av in items:
+        if op is sre_constants.AT:
+            if av in _JOIN_SAFE_ANCHORS or (multiline and av in _LINE_ANCHORS):
+                continue
+            return False
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT, sre_constants.GROUPREF,
+                  sre_constants.GROUPREF_EXISTS):
+            return False
+        if op is sre_constants.SUBPATTERN:
+            children = [av[-1]]
+        elif op is sre_constants.BRANCH:
+            children = av[1]
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            children = [av[2]]
+        else:
+            children = []
+        if not all(_joinable(child, multiline) for child in children):
+            return False
+    return True
+
+
+def _word_start_rule(body: str, flags: int) -> Optional[str]:
+    """Si la regla es \\b seguido de algo que empieza por letra, devuelve ese resto"""
+    if not body.startswith('\\b'):
+        return None
+    rest = body[2:]
+    try:
+        starts = _starts_with_word(sre_parse.parse(rest, flags))
+    except re.error:
+        return None
+    return rest if starts else None
+
+
+class RuleScanner:
+    """
+    Conjunto de reglas compilado una vez y aplicado en una pasada por texto
+
+    rules es una secuencia de (patrón, flags); cada regla conserva sus flags
+    aunque todas compartan el mismo patrón combinado.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, int]]):
+        self.rules = list(rules)
+        # Las reglas del tipo \b<palabra> comparten una única comprobación de
+        # inicio de palabra: en el resto de posiciones ni se intentan
+        word_rules, other_rules, captures = [], [], []
+        self.joinable = True
+        for index, (pattern, flags) in enumerate(self.rules):
+            body, flags = _split_flags(pattern, flags)
+            self.joinable = self.joinable and _joinable(sre_parse.parse(body, flags),
+                                                        bool(flags & re.MULTILINE))
+            captures.append(f"(?=(?P<r{index}>{_scoped(body, flags)}))?")
+            rest = _word_start_rule(body, flags)
+            if rest is not None:
+                word_rules.append(_scoped(rest, flags))
+            else:
+                other_rules.append(_scoped(body, flags))
+        if word_rules:
+            other_rules.insert(0, f"\\b(?=\\w)(?:{'|'.join(word_rules)})")
+        self.pattern = None
+        self._groups: List[int] = []
+        if self.rules:
+            self.pattern = re.compile(f"(?=(?:{'|'.join(other_rules)})){''.join(captures)}")
+            self._groups = [self.pattern.groupindex[f'r{index}'] for index in range(len(self.rules))]
+
+    def finditer(self, text: str, window: Optional[int] = None, overlap: int = 0,
+                 deadline: Optional[float] = None) -> List[RuleMatch]:
+        """
+        Coincidencias de todas las reglas, ordenadas por regla y posición
+
+        Con window, el texto se recorre por ventanas de ese tamaño que se
+        solapan overlap caracteres: cada ventana se queda con lo que empieza
+        antes del solape, así que las coincidencias de hasta overlap
+        caracteres son las mismas que sin ventanas (las más largas se cortan
+        en el borde). Si se pasa deadline (time.perf_counter()) y se agota
+        entre dos ventanas o durante una con muchas coincidencias, lanza
+        ScanTimeout.
+        """
+        if window is not None and window <= overlap:
+            raise ValueError("window debe ser mayor que overlap")
+        if not text or self.pattern is None:
+            return []
+        length = len(text)
+        found: List[List[RuleMatch]] = [[] for _ in self._groups]
+        resume = [0] * len(self._groups)
+        position = 0
+        while True:
+            limit = length if window is None else min(position + window, length)
+            owned = limit if limit == length else limit - overlap
+            for count, match in enumerate(self.pattern.finditer(text, position, limit), 1):
+                if match.start() >= owned:
+                    break
+                if (deadline is not None and not count % DEADLINE_CHECK_EVERY
+                        and time.perf_counter() > deadline):
+                    raise ScanTimeout(f"escaneo interrumpido en la posición {match.start()} de {length}")
+                regs = match.regs
+                for index, group in enumerate(self._groups):
+                    start, end = regs[group]
+                    # start == -1 si la regla no empieza aquí; start < resume si
+                    # solaparía con su coincidencia anterior (finditer no solapa)
+                    if start >= resume[index]:
+                        resume[index] = end if end > start else end + 1
+                        found[index].append(RuleMatch(index, start, end))
+            if limit == length:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                raise ScanTimeout(f"escaneo interrumpido en la posición {owned} de {length}")
+            position = owned
+        return [match for matches in found for match in matches]
+
+    def finditer_many(self, texts: Sequence[str]) -> List[List[RuleMatch]]:
+        """Coincidencias de cada texto del lote (igual que finditer texto a texto)"""
+        if not self.joinable or len(texts) < 2:
+            return [self.finditer(text) for text in texts]
+        starts = []
+        position = 0
+        for text in texts:
+            starts.append(position)
+            position += len(text) + len(BATCH_SEPARATOR)
+        found: List[List[RuleMatch]] = [[] for _ in texts]
+        rescan = set()
+        for match in self.finditer(BATCH_SEPARATOR.join(texts)):
+            index = bisect_right(starts, match.start) - 1
+            offset = starts[index]
+            if match.end > offset + len(texts[index]) or match.start >= offset + len(texts[index]):
+                # Desborda su texto: la regla puede haber tapado coincidencias
+                # en los siguientes, que se escanean de nuevo por separado
+                rescan.update(range(index, bisect_right(starts, match.end - 1)))
+                continue
+            found[index].append(RuleMatch(match.rule, match.start - offset, match.end - offset))
+        for index in rescan:
+            found[index] = self.finditer(texts[index])
+        return found
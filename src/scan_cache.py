@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Scan Cache - Caché persistente de veredictos de PromptInjectionGuard
+Indexa cada escaneo por (versión del conjunto de reglas, tipo de contenido,
+sha256 del texto). Un acierto devuelve is_safe, el texto saneado y las
+amenazas sin pasar ninguna expresión regular; cambiar cualquier regla cambia
+la versión y deja las entradas anteriores inservibles, que se purgan al
+guardar. Expulsión LRU con un tope de entradas.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+DEFAULT_SCAN_CACHE_PATH = ".cache/scan_verdicts.json"
+SCAN_CACHE_MAX_ENTRIES = 20000
+
+# (is_safe, texto saneado, amenazas en forma compacta: [tipo, gravedad, posiciones, detalle])
+Verdict = Tuple[bool, str, List[List[str]]]
+
+
+def ruleset_version(*rules: Any) -> str:
+    """Huella corta de un conjunto de reglas (cualquier estructura serializable)"""
+    payload = json.dumps(rules, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ScanCache:
+    """
+    Caché LRU persistente de veredictos de escaneo
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_SCAN_CACHE_PATH,
+                 max_entries: int = SCAN_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Verdict]" = OrderedDict()
+        self._rulesets = set()      # versiones consultadas en esta ejecución
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = OrderedDict(data)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Caché de escaneos ilegible, se ignora: {e}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(ruleset: str, content_type: str, content: str) -> str:
+        digest = hashlib.sha256(content.encode('utf-8', 'surrogatepass')).hexdigest()
+        return f"{ruleset}:{content_type}:{digest}"
+
+    def get(self, ruleset: str, content_type: str, content: str) -> Optional[Verdict]:
+        """Veredicto cacheado (y lo marca como usado recientemente) o None"""
+        key = self.key(ruleset, content_type, content)
+        with self._lock:
+            self._rulesets.add(ruleset)
+            verdict = self._entries.get(key)
+            if verdict is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return verdict
+
+    def put(self, ruleset: str, content_type: str, content: str, verdict: Verdict):
+        key = self.key(ruleset, content_type, content)
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """Escribe la caché a disco de forma atómica, sin veredictos de reglas antiguas"""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            if self._rulesets:
+                stale = [key for key in self._entries if key.split(':', 1)[0] not in self._rulesets]
+                for key in stale:
+                    del self._entries[key]
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def report(self) -> str:
+        total = self.stats['hits'] + self.stats['misses']
+        rate = self.stats['hits'] / total if total else 0.0
+        return (f"🧾 Caché de escaneos: {self.stats['hits']} hits, {self.stats['misses']} misses "
+                f"({rate:.0%} hit rate, {len(self._entries)} veredictos)")
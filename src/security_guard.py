@@ -5,15 +5,56 @@ Protege el newsletter contra contenido malicioso y ataques de manipulación
 """
 import re
 import html
+import time
 import urllib.parse
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Any, NamedTuple, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, field
 import logging
+from src.rule_scanner import RuleMatch, ScanTimeout
+from src.scan_cache import ScanCache, ruleset_version
+from src.security_rules import DEFAULT_RULES_PATH, RULE_LISTS, Ruleset, compile_ruleset, load_ruleset
 
 # Configurar logging para seguridad
 security_logger = logging.getLogger('security')
 security_logger.setLevel(logging.WARNING)
 
+# Amenazas recientes que se conservan completas (el resto solo cuenta)
+THREAT_HISTORY_SIZE = 200
+
+# Tamaño mínimo de lote para repartir el escaneo entre procesos
+PARALLEL_MIN_BATCH = 2000
+
+# Súbelo al cambiar la lógica de escaneo o saneado: invalida la caché de veredictos
+SCANNER_VERSION = 4
+
+# Límites por texto frente a contenido hostil: lo que pase de MAX_SCAN_CHARS
+# se descarta, los textos más largos que SCAN_WINDOW se escanean por ventanas
+# solapadas y, si el escaneo supera SCAN_TIME_BUDGET segundos, el texto se
+# bloquea (falla cerrado). Es un límite blando: el plazo se comprueba dentro
+# del escaneo de reglas y entre etapas, así que puede pasarse en lo que tarde
+# la etapa en curso (decenas de ms en el peor caso, ver
+# benchmarks/bench_scan_worst_case.py)
+MAX_SCAN_CHARS = 64 * 1024
+SCAN_WINDOW = 4096
+SCAN_WINDOW_OVERLAP = 256
+SCAN_TIME_BUDGET = 0.5
+
+# URLs dentro de un texto
+_URL_PATTERN = re.compile(r'https?://[^\s<>"{}|\\^`\[\]]+')
+
+# Atributos peligrosos (onclick, onload, onerror, onmouseover y javascript:)
+# con su valor entre comillas. Los tags no hacen falta: tras escapar no queda
+# ningún '<'. El primer carácter va en una clase sin IGNORECASE para que re
+# salte en C hasta cada posible inicio (o/j no tienen otras variantes)
+# (con longitudes acotadas: sin comillas de cierre cada inicio recorrería el
+# resto del texto y el coste sería cuadrático)
+_DANGEROUS_ATTR_PATTERN = re.compile(
+    r'[oOjJ](?i:(?<=o)n(?:click|load|error|mouseover)|(?<=j)avascript:)'
+    r'[^"\'\s]{0,256}["\'][^"\']{0,4096}["\']'
+)
+
 @dataclass
 class SecurityThreat:
     """Representa una amenaza de seguridad detectada"""
@@ -23,6 +64,144 @@ class SecurityThreat:
     original_content: str
     sanitized_content: str
     location: str
+    # Posiciones (inicio, fin) en el texto escaneado de lo que hay que sustituir
+    spans: Tuple[Tuple[int, int], ...] = field(default=(), compare=False, repr=False)
+
+
+# Amenaza en forma compacta: (tipo, gravedad, posiciones, detalle). El
+# detalle es la palabra clave, el dominio, el esquema o el error, según el tipo
+ThreatHit = Tuple[str, str, Tuple[Tuple[int, int], ...], str]
+
+# Por tipo: (descripción, reemplazo, ubicación). Campos: {text} (el texto de
+# la primera posición), {detail}, {start}, {end}, {content_type}
+_THREAT_FORMATS = {
+    'prompt_injection': ("Posible intento de prompt injection detectado: '{text}'",
+                         "[CONTENIDO REMOVIDO POR SEGURIDAD]", "{content_type}:{start}-{end}"),
+    'ai_manipulation': ("Palabra clave prohibida detectada: '{detail}'",
+                        "[CONTENIDO FILTRADO]", "{content_type}:keyword_detection"),
+    'suspicious_content': ("Contenido sospechoso detectado: '{text}'",
+                           "[CONTENIDO REVISADO]", "{content_type}:{start}-{end}"),
+    'malicious_url': ("URL de dominio sospechoso: {detail}",
+                      "[URL REMOVIDA POR SEGURIDAD]", "{content_type}:url_validation"),
+    'suspicious_scheme': ("Esquema de URL sospechoso: {detail}",
+                          None, "{content_type}:scheme_validation"),
+    'malformed_url': ("URL malformada: {detail}",
+                      "[URL MALFORMADA REMOVIDA]", "{content_type}:url_parsing"),
+    'oversized_content': ("Texto de {detail} caracteres recortado a {start}",
+                          "", "{content_type}:{start}-{detail}"),
+    'scan_timeout': ("Escaneo sin terminar en {detail}s: contenido bloqueado",
+                     "", "{content_type}:scan_budget"),
+}
+
+_BLOCKING_SEVERITIES = ('critical', 'high')
+
+
+class ThreatList(Sequence):
+    """
+    Amenazas de un escaneo en forma compacta
+
+    Se comporta como una lista de SecurityThreat, pero cada objeto (con sus
+    copias del texto y su descripción) se construye solo al pedirlo; contar,
+    decidir el veredicto o sanear usan directamente las formas compactas.
+    """
+    __slots__ = ('content', 'content_type', 'hits', '_threats')
+
+    def __init__(self, content: str, content_type: str, hits: Sequence[ThreatHit] = ()):
+        self.content = content
+        self.content_type = content_type
+        self.hits: List[ThreatHit] = list(hits)
+        self._threats: Optional[List[SecurityThreat]] = None
+
+    def __len__(self) -> int:
+        return len(self.hits)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if self._threats is not None:
+            return self._threats[index]
+        if isinstance(index, slice):
+            return [self._build(hit) for hit in self.hits[index]]
+        return self._build(self.hits[index])
+
+    def __iter__(self) -> Iterator[SecurityThreat]:
+        if self._threats is None:
+            self._threats = [self._build(hit) for hit in self.hits]
+        return iter(self._threats)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (ThreatList, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ThreatList({self.content_type!r}, {len(self.hits)} amenazas)"
+
+    def _build(self, hit: ThreatHit) -> SecurityThreat:
+        threat_type, severity, spans, detail = hit
+        description, replacement, location = _THREAT_FORMATS[threat_type]
+        start, end = spans[0] if spans else (0, 0)
+        text = self.content[start:end]
+        if threat_type == 'ai_manipulation':
+            text = detail
+        elif threat_type == 'oversized_content':
+            text = self.content[start:start + 100]
+        elif threat_type == 'scan_timeout':
+            text = self.content[:100]
+        if replacement is None:
+            parsed = urllib.parse.urlparse(text)
+            replacement = f"https://{parsed.netloc}{parsed.path}"
+        values = {'text': text, 'detail': detail, 'start': start, 'end': end,
+                  'content_type': self.content_type}
+        return SecurityThreat(
+            threat_type=threat_type,
+            severity=severity,
+            description=description.format(**values),
+            original_content=text,
+            sanitized_content=replacement,
+            location=location.format(**values),
+            spans=spans,
+        )
+
+    def is_blocking(self) -> bool:
+        """Hay alguna amenaza grave (critical o high)"""
+        return any(hit[1] in _BLOCKING_SEVERITIES for hit in self.hits)
+
+    def redactions(self) -> Iterator[Tuple[int, int, str]]:
+        """(inicio, fin, reemplazo) de cada posición de las amenazas graves"""
+        for threat_type, severity, spans, _ in self.hits:
+            if severity in _BLOCKING_SEVERITIES:
+                replacement = _THREAT_FORMATS[threat_type][1]
+                for start, end in spans:
+                    yield start, end, replacement
+
+    def count_by(self, position: int) -> Counter:
+        """Recuento por tipo (0) o por gravedad (1)"""
+        return Counter(hit[position] for hit in self.hits)
+
+    def to_cache(self) -> List[List[Any]]:
+        return [list(hit) for hit in self.hits]
+
+    @classmethod
+    def from_cache(cls, content: str, content_type: str, hits: List[List[Any]]) -> "ThreatList":
+        return cls(content, content_type, [
+            (threat_type, severity, tuple(tuple(span) for span in spans), detail)
+            for threat_type, severity, spans, detail in hits
+        ])
+
+
+class ScanResult(NamedTuple):
+    """Resultado de escanear un texto (misma forma que la tupla de scan_content)"""
+    is_safe: bool
+    sanitized: str
+    threats: ThreatList
+
+
+_EMPTY_RESULT = ScanResult(True, "", ThreatList("", "general"))
+
+
+def _field_value(record: Any, field: str) -> str:
+    """Campo de un dict o de un objeto con atributos (p. ej. Story); '' si falta"""
+    value = record.get(field) if isinstance(record, dict) else getattr(record, field, None)
+    return '' if value is None else value
 
 
 class PromptInjectionGuard:
@@ -30,280 +209,368 @@ class PromptInjectionGuard:
     Sistema avanzado de protección contra prompt injection y contenido malicioso
     """
     
-    def __init__(self):
-        self.threats_detected: List[SecurityThreat] = []
-        self._setup_patterns()
+    def __init__(self, scan_cache: Optional[ScanCache] = None, rules_path: str = DEFAULT_RULES_PATH,
+                 ruleset: Optional[Ruleset] = None):
+        # Historial acotado + contadores: memoria constante en procesos largos
+        # (lista de amenazas, índice): la SecurityThreat se construye al consultarla
+        self.threats_detected: Deque[Tuple[ThreatList, int]] = deque(maxlen=THREAT_HISTORY_SIZE)
+        self.threats_by_type: Counter = Counter()
+        self.threats_by_severity: Counter = Counter()
+        self.scan_cache = scan_cache
+        self.rules_path = rules_path
+        self._setup_patterns(ruleset)
     
-    def _setup_patterns(self):
-        """Configura patrones de detección de amenazas"""
-        
-        # Patrones de prompt injection comunes
-        self.injection_patterns = [
-            # Comandos de sistema/prompt manipulation
-            r'(?i)\b(ignore|forget|disregard)\s+(previous|all|above|prior)\s+(instructions|prompts|rules)',
-            r'(?i)\b(system|admin|root|sudo)\s*(prompt|mode|access|override)',
-            r'(?i)\b(act\s+as|pretend\s+to\s+be|roleplay\s+as)\s+.{0,50}(admin|system|root)',
-            
-            # Intentos de escape de contexto
-            r'(?i)\b(break|exit|escape)\s+(out|from)\s+(context|sandbox|mode)',
-            r'(?i)\b(end\s+)?(simulation|roleplay|character|persona)',
-            
-            # Inyección de instrucciones
-            r'(?i)^\s*(new\s+)?(instruction|command|directive|rule)s?\s*:',
-            r'(?i)\b(override|bypass|circumvent)\s+(security|safety|filter)',
-            
-            # Manipulación de salida
-            r'(?i)\b(print|output|display|show|reveal)\s+.{0,30}(password|token|key|secret)',
-            r'(?i)\b(include|insert|add)\s+.{0,30}(malicious|harmful|inappropriate)',
-            
-            # Técnicas de social engineering
-            r'(?i)\b(urgent|emergency|critical|immediate)\s+.{0,30}(action|response|override)',
-            r'(?i)\b(developer|engineer|creator)\s+(said|told|instructed)',
-            
-            # Inyección de código/scripts
-            r'<script[^>]*>.*?</script>',
-            r'javascript\s*:',
-            r'on(click|load|error|focus|blur)\s*=',
-            
-            # SQL injection básico
-            r'(?i)\b(union|select|insert|update|delete|drop)\s+(all|from|into|table)',
-            r'(?i)\'\s*(or|and)\s*\'\w*\'\s*=\s*\'\w*\'',
-            
-            # Command injection
-            r'[;&|`$(){}]',
-            r'(?i)\b(curl|wget|nc|netcat|bash|sh|cmd|powershell)\b',
-            
-            # Intentos de revelar información del sistema
-            r'(?i)\b(version|config|environment|variables|secrets|credentials)',
-            r'(?i)\b(api\s+key|access\s+token|bearer\s+token)',
-        ]
-        
-        # Patrones de contenido sospechoso
-        self.suspicious_patterns = [
-            r'(?i)\b(click\s+here|urgent|limited\s+time|act\s+now)\b',
-            r'(?i)\b(phishing|scam|fraud|malware|virus)\b',
-            r'(?i)\b(cryptocurrency|bitcoin|invest\s+now|guaranteed\s+profit)\b',
-            r'https?://[^\s]+\.tk|\.ml|\.ga|\.cf',  # Dominios sospechosos
-            r'(?i)\b(free\s+money|get\s+rich|work\s+from\s+home)\b',
-        ]
-        
-        # URLs y dominios maliciosos comunes
-        self.malicious_domains = [
-            'bit.ly', 'tinyurl.com', 'goo.gl', 't.co',  # Acortadores (pueden ocultar malware)
-            'suspicious-domain.tk', 'malware-site.ml',  # Ejemplos de dominios maliciosos
-        ]
-        
-        # Palabras clave prohibidas en contexto de IA
-        self.ai_forbidden_keywords = [
-            'jailbreak', 'dan mode', 'developer mode', 'god mode',
-            'unrestricted', 'uncensored', 'no limits', 'no restrictions',
-            'bypass filter', 'ignore safety', 'disable ethics',
-        ]
+    def _setup_patterns(self, ruleset: Optional[Ruleset] = None):
+        """Configura patrones de detección de amenazas (del archivo de reglas, ya compilados)"""
+        self._use_ruleset(ruleset or load_ruleset(self.rules_path))
+    
+    def _use_ruleset(self, ruleset: Ruleset):
+        # Listas propias: modificarlas en un guard no afecta a los demás
+        for name, values in ruleset.lists().items():
+            setattr(self, name, list(values))
+        self._apply_ruleset(ruleset)
     
-    def scan_content(self, content: str, content_type: str = "general") -> Tuple[bool, str, List[SecurityThreat]]:
+    def _apply_ruleset(self, ruleset: Ruleset):
+        self._ruleset = ruleset
+        self.domain_policy = ruleset.domain_policy
+        self._rule_scanner = ruleset.rule_scanner
+        self._keyword_matcher = ruleset.keyword_matcher
+        
+        # Huella de las reglas y del escáner: clave de la caché de veredictos
+        self.ruleset_version = ruleset_version(
+            SCANNER_VERSION, ruleset.fingerprint, _URL_PATTERN.pattern, _DANGEROUS_ATTR_PATTERN.pattern,
+        )
+    
+    def compile_rules(self):
+        """Compila las listas de reglas; hay que llamarlo tras modificarlas"""
+        self._apply_ruleset(compile_ruleset(*(tuple(getattr(self, name)) for name in RULE_LISTS)))
+    
+    def reload_rules(self) -> bool:
+        """
+        Vuelve a cargar el archivo de reglas si ha cambiado, sin reiniciar el
+        proceso; devuelve True si el guard pasa a usar otras reglas
+        """
+        ruleset = load_ruleset(self.rules_path)
+        if ruleset is self._ruleset:
+            return False
+        self._use_ruleset(ruleset)
+        return True
+    
+    def scan_content(self, content: str, content_type: str = "general") -> Tuple[bool, str, ThreatList]:
         """
         Escanea contenido en busca de amenazas de seguridad
         
         Returns:
-            (is_safe: bool, sanitized_content: str, threats: List[SecurityThreat])
+            (is_safe: bool, sanitized_content: str, threats: ThreatList)
+            threats se usa como una lista de SecurityThreat, que se
+            construyen solo si se consultan
         """
         if not content:
-            return True, "", []
+            return True, "", ThreatList(content, content_type)
+        
+        cached = None
+        if self.scan_cache is not None:
+            cached = self.scan_cache.get(self.ruleset_version, content_type, content)
+        if cached is not None:
+            is_safe, sanitized_content, hits = cached
+            threats = ThreatList.from_cache(content, content_type, hits)
+        else:
+            is_safe, sanitized_content, threats = self._scan_uncached(content, content_type)
+            if self.scan_cache is not None and _cacheable(threats):
+                self.scan_cache.put(self.ruleset_version, content_type, content,
+                                    (is_safe, sanitized_content, threats.to_cache()))
+        
+        # Registrar y loguear amenazas detectadas (un resumen por escaneo)
+        if threats:
+            self._record_threats([threats])
+            _log_threats([threats], "en %s", content_type)
         
-        original_content = content
+        return is_safe, sanitized_content, threats
+    
+    def scan_many(self, records: Iterable[Any], fields: Sequence[str],
+                  content_types: Optional[Dict[str, str]] = None,
+                  workers: Optional[int] = None) -> List[Dict[str, ScanResult]]:
+        """
+        Escanea en un solo lote los campos `fields` de todos los registros
+        
+        Devuelve, alineado con la entrada, un dict campo -> ScanResult por
+        registro (un campo ausente cuenta como texto vacío). content_types
+        da el tipo de contenido de cada campo (por defecto, su nombre). Con
+        workers, los lotes de al menos PARALLEL_MIN_BATCH textos se reparten
+        en ese número de procesos.
+        """
+        records = list(records)
+        content_types = content_types or {}
+        texts = [(_field_value(record, field), content_types.get(field, field))
+                 for record in records for field in fields]
+        results = self._scan_batch(texts, workers)
+        width = len(fields)
+        return [dict(zip(fields, results[row * width:(row + 1) * width])) for row in range(len(records))]
+    
+    def _scan_batch(self, texts: List[Tuple[str, str]], workers: Optional[int] = None) -> List[ScanResult]:
+        """Escanea (texto, tipo) en lote: caché, textos repetidos una vez, una pasada de reglas"""
+        results: List[Optional[ScanResult]] = [None] * len(texts)
+        pending: Dict[Tuple[str, str], List[int]] = {}
+        for index, (content, content_type) in enumerate(texts):
+            if not content:
+                results[index] = _EMPTY_RESULT
+                continue
+            cached = None
+            if self.scan_cache is not None and (content, content_type) not in pending:
+                cached = self.scan_cache.get(self.ruleset_version, content_type, content)
+            if cached is not None:
+                is_safe, sanitized_content, hits = cached
+                results[index] = ScanResult(is_safe, sanitized_content,
+                                            ThreatList.from_cache(content, content_type, hits))
+            else:
+                pending.setdefault((content, content_type), []).append(index)
+        
+        unique = list(pending)
+        if workers and len(unique) >= PARALLEL_MIN_BATCH:
+            computed = self._scan_parallel(unique, workers)
+        else:
+            all_matches = self._match_texts([content for content, _ in unique])
+            computed = [ScanResult(*self._scan_uncached(content, content_type, matches))
+                        for (content, content_type), matches in zip(unique, all_matches)]
+        
+        for key, result in zip(unique, computed):
+            for index in pending[key]:
+                results[index] = result
+            if self.scan_cache is not None and _cacheable(result.threats):
+                self.scan_cache.put(self.ruleset_version, key[1], key[0],
+                                    (result.is_safe, result.sanitized, result.threats.to_cache()))
+        
+        # Un único registro y log por lote
+        threat_lists = [result.threats for result in results if result.threats]
+        if threat_lists:
+            self._record_threats(threat_lists)
+            _log_threats(threat_lists, "en lote de %d textos", len(texts))
+        return results
+    
+    def rule_lists(self) -> Dict[str, List[str]]:
+        """Listas de reglas del guard, para reconstruirlo en otro proceso"""
+        return {name: getattr(self, name) for name in RULE_LISTS}
+    
+    def _scan_parallel(self, texts: List[Tuple[str, str]], workers: int) -> List[ScanResult]:
+        """Reparte el lote en trozos entre `workers` procesos con las mismas reglas"""
+        size = max(1, -(-len(texts) // (workers * 4)))
+        chunks = [texts[start:start + size] for start in range(0, len(texts), size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(self.rules_path, self.rule_lists())) as pool:
+            return [result for chunk in pool.map(_scan_chunk, chunks) for result in chunk]
+    
+    def _record_threats(self, threat_lists: List[ThreatList]):
+        """Actualiza los contadores y apunta las últimas amenazas en el historial circular"""
+        for threats in threat_lists:
+            self.threats_by_type.update(threats.count_by(0))
+            self.threats_by_severity.update(threats.count_by(1))
+        recent: List[Tuple[ThreatList, int]] = []
+        for threats in reversed(threat_lists):
+            missing = THREAT_HISTORY_SIZE - len(recent)
+            if missing <= 0:
+                break
+            recent[:0] = [(threats, index) for index in range(max(0, len(threats) - missing), len(threats))]
+        self.threats_detected.extend(recent)
+    
+    def recent_threats(self) -> List[SecurityThreat]:
+        """Últimas amenazas detectadas (como mucho THREAT_HISTORY_SIZE), de la más antigua a la más reciente"""
+        return [threats[index] for threats, index in self.threats_detected]
+    
+    def _match_texts(self, contents: List[str]) -> List[Optional[List[RuleMatch]]]:
+        """
+        Coincidencias de las reglas para un lote: los textos cortos en una
+        pasada conjunta; los largos quedan a None y _scan_uncached los
+        escanea por ventanas, con su propio plazo
+        """
+        matches: List[Optional[List[RuleMatch]]] = [None] * len(contents)
+        short = [index for index, content in enumerate(contents) if len(content) <= SCAN_WINDOW]
+        found = self._rule_scanner.finditer_many([contents[index] for index in short])
+        for index, text_matches in zip(short, found):
+            matches[index] = text_matches
+        return matches
+    
+    def _scan_uncached(self, content: str, content_type: str,
+                       matches: Optional[List[RuleMatch]] = None) -> Tuple[bool, str, ThreatList]:
+        """Escaneo completo, sin pasar por la caché de veredictos, con tiempo acotado"""
+        deadline = time.perf_counter() + SCAN_TIME_BUDGET
+        try:
+            return self._scan_bounded(content, content_type, matches, deadline)
+        except ScanTimeout:
+            # Falla cerrado: lo que no se pudo escanear a tiempo no se publica
+            return False, "", ThreatList(content, content_type,
+                                         [("scan_timeout", "critical", (), str(SCAN_TIME_BUDGET))])
+    
+    def _scan_bounded(self, content: str, content_type: str, matches: Optional[List[RuleMatch]],
+                      deadline: float) -> Tuple[bool, str, ThreatList]:
+        threats = ThreatList(content, content_type)
+        
+        # 0. Recortar textos desmesurados
+        if len(content) > MAX_SCAN_CHARS:
+            threats.hits.append(("oversized_content", "medium", ((MAX_SCAN_CHARS, len(content)),),
+                                 str(len(content))))
+            content = content[:MAX_SCAN_CHARS]
+            matches = None
         sanitized_content = content
-        threats = []
         
-        # 1. Detectar prompt injection
-        injection_threats = self._detect_prompt_injection(content, content_type)
-        threats.extend(injection_threats)
+        # 1. Detectar prompt injection (una sola pasada para todas las reglas,
+        # por ventanas si el texto es largo)
+        if matches is None:
+            matches = self._rule_scanner.finditer(content, SCAN_WINDOW, SCAN_WINDOW_OVERLAP, deadline)
+        injection_threats = self._detect_prompt_injection(content, content_type, matches)
+        threats.hits.extend(injection_threats.hits)
+        _check_deadline(deadline)
         
         # 2. Detectar contenido sospechoso
-        suspicious_threats = self._detect_suspicious_content(content, content_type)
-        threats.extend(suspicious_threats)
+        suspicious_threats = self._detect_suspicious_content(content, content_type, matches)
+        threats.hits.extend(suspicious_threats.hits)
+        _check_deadline(deadline)
         
         # 3. Validar URLs
         url_threats = self._validate_urls(content, content_type)
-        threats.extend(url_threats)
+        threats.hits.extend(url_threats.hits)
+        _check_deadline(deadline)
         
-        # 4. Sanitizar HTML
-        sanitized_content = self._sanitize_html(sanitized_content)
-        
-        # 5. Limpiar contenido basado en amenazas detectadas
+        # 4. Limpiar contenido basado en amenazas detectadas (sobre el
+        # texto original, que es al que se refieren sus posiciones)
         sanitized_content = self._apply_sanitization(sanitized_content, threats)
         
-        # Determinar si el contenido es seguro
-        critical_threats = [t for t in threats if t.severity in ['critical', 'high']]
-        is_safe = len(critical_threats) == 0
+        # 5. Sanitizar HTML
+        sanitized_content = self._sanitize_html(sanitized_content)
         
-        # Log amenazas detectadas
-        if threats:
-            security_logger.warning(f"Amenazas detectadas en {content_type}: {len(threats)} amenazas")
-            for threat in threats:
-                security_logger.warning(f"  - {threat.threat_type} ({threat.severity}): {threat.description}")
+        # Determinar si el contenido es seguro
+        is_safe = not threats.is_blocking()
         
         return is_safe, sanitized_content, threats
     
-    def _detect_prompt_injection(self, content: str, content_type: str) -> List[SecurityThreat]:
+    def _detect_prompt_injection(self, content: str, content_type: str,
+                                 matches: Optional[List[RuleMatch]] = None) -> ThreatList:
         """Detecta intentos de prompt injection"""
-        threats = []
-        
-        for pattern in self.injection_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                threat = SecurityThreat(
-                    threat_type="prompt_injection",
-                    severity="critical",
-                    description=f"Posible intento de prompt injection detectado: '{match.group()}'",
-                    original_content=match.group(),
-                    sanitized_content="[CONTENIDO REMOVIDO POR SEGURIDAD]",
-                    location=f"{content_type}:{match.start()}-{match.end()}"
-                )
-                threats.append(threat)
-        
-        # Detectar palabras clave específicas de IA
-        for keyword in self.ai_forbidden_keywords:
-            if keyword.lower() in content.lower():
-                threat = SecurityThreat(
-                    threat_type="ai_manipulation",
-                    severity="high",
-                    description=f"Palabra clave prohibida detectada: '{keyword}'",
-                    original_content=keyword,
-                    sanitized_content="[CONTENIDO FILTRADO]",
-                    location=f"{content_type}:keyword_detection"
-                )
-                threats.append(threat)
-        
-        return threats
+        hits: List[ThreatHit] = []
+        if matches is None:
+            matches = self._rule_scanner.finditer(content)
+        
+        injection_rules = len(self.injection_patterns)
+        for match in matches:
+            if match.rule < injection_rules:
+                hits.append(("prompt_injection", "critical", ((match.start, match.end),), ""))
+        
+        # Detectar palabras clave específicas de IA (todas en una pasada)
+        keyword_spans: Dict[int, List[Tuple[int, int]]] = {}
+        for index, start, end in self._keyword_matcher.finditer(content):
+            keyword_spans.setdefault(index, []).append((start, end))
+        for index in sorted(keyword_spans):
+            hits.append(("ai_manipulation", "high", tuple(keyword_spans[index]),
+                         self._keyword_matcher.keywords[index]))
+        
+        return ThreatList(content, content_type, hits)
     
-    def _detect_suspicious_content(self, content: str, content_type: str) -> List[SecurityThreat]:
+    def _detect_suspicious_content(self, content: str, content_type: str,
+                                   matches: Optional[List[RuleMatch]] = None) -> ThreatList:
         """Detecta contenido sospechoso o potencialmente malicioso"""
-        threats = []
-        
-        for pattern in self.suspicious_patterns:
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
-                threat = SecurityThreat(
-                    threat_type="suspicious_content",
-                    severity="medium",
-                    description=f"Contenido sospechoso detectado: '{match.group()}'",
-                    original_content=match.group(),
-                    sanitized_content="[CONTENIDO REVISADO]",
-                    location=f"{content_type}:{match.start()}-{match.end()}"
-                )
-                threats.append(threat)
-        
-        return threats
+        if matches is None:
+            matches = self._rule_scanner.finditer(content)
+        
+        injection_rules = len(self.injection_patterns)
+        return ThreatList(content, content_type, [
+            ("suspicious_content", "medium", ((match.start, match.end),), "")
+            for match in matches if match.rule >= injection_rules
+        ])
     
-    def _validate_urls(self, content: str, content_type: str) -> List[SecurityThreat]:
+    def _validate_urls(self, content: str, content_type: str) -> ThreatList:
         """Valida URLs en busca de dominios maliciosos o sospechosos"""
-        threats = []
+        hits: List[ThreatHit] = []
         
         # Extraer URLs del contenido
-        url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-        urls = re.findall(url_pattern, content)
-        
-        for url in urls:
+        for match in _URL_PATTERN.finditer(content):
+            spans = (match.span(),)
             try:
-                parsed = urllib.parse.urlparse(url)
-                domain = parsed.netloc.lower()
+                parsed = urllib.parse.urlparse(match.group())
                 
-                # Verificar dominios maliciosos conocidos
-                for malicious_domain in self.malicious_domains:
-                    if malicious_domain in domain:
-                        threat = SecurityThreat(
-                            threat_type="malicious_url",
-                            severity="high",
-                            description=f"URL de dominio sospechoso: {domain}",
-                            original_content=url,
-                            sanitized_content="[URL REMOVIDA POR SEGURIDAD]",
-                            location=f"{content_type}:url_validation"
-                        )
-                        threats.append(threat)
+                # Verificar dominios maliciosos conocidos (y sus subdominios)
+                if self.domain_policy.is_denied(parsed.hostname or ''):
+                    hits.append(("malicious_url", "high", spans, parsed.netloc.lower()))
                 
                 # Verificar esquemas sospechosos
                 if parsed.scheme not in ['http', 'https']:
-                    threat = SecurityThreat(
-                        threat_type="suspicious_scheme",
-                        severity="medium",
-                        description=f"Esquema de URL sospechoso: {parsed.scheme}",
-                        original_content=url,
-                        sanitized_content=f"https://{parsed.netloc}{parsed.path}",
-                        location=f"{content_type}:scheme_validation"
-                    )
-                    threats.append(threat)
+                    hits.append(("suspicious_scheme", "medium", spans, parsed.scheme))
                     
             except Exception as e:
-                threat = SecurityThreat(
-                    threat_type="malformed_url",
-                    severity="medium",
-                    description=f"URL malformada: {str(e)}",
-                    original_content=url,
-                    sanitized_content="[URL MALFORMADA REMOVIDA]",
-                    location=f"{content_type}:url_parsing"
-                )
-                threats.append(threat)
+                hits.append(("malformed_url", "medium", spans, str(e)))
         
-        return threats
+        return ThreatList(content, content_type, hits)
     
     def _sanitize_html(self, content: str) -> str:
-        """Sanitiza contenido HTML para prevenir XSS"""
-        # Escapar caracteres HTML peligrosos
-        content = html.escape(content, quote=False)
-        
-        # Remover tags script y otros peligrosos
-        dangerous_tags = ['script', 'iframe', 'object', 'embed', 'form', 'input']
-        for tag in dangerous_tags:
-            content = re.sub(f'<{tag}[^>]*>.*?</{tag}>', '', content, flags=re.IGNORECASE | re.DOTALL)
-            content = re.sub(f'<{tag}[^>]*/?>', '', content, flags=re.IGNORECASE)
-        
-        # Remover atributos peligrosos
-        dangerous_attrs = ['onclick', 'onload', 'onerror', 'onmouseover', 'javascript:']
-        for attr in dangerous_attrs:
-            content = re.sub(f'{attr}[^"\'\\s]*["\'][^"\']*["\']', '', content, flags=re.IGNORECASE)
-        
-        return content
+        """
+        Sanitiza contenido HTML para prevenir XSS
+
+        Quita los atributos peligrosos sobre el texto original y escapa una
+        sola vez: el escape solo toca &, < y >, que el patrón de atributos
+        trata como cualquier otro carácter, así que el orden no cambia nada.
+        """
+        content = _DANGEROUS_ATTR_PATTERN.sub('', content)
+        return html.escape(content, quote=False)
     
-    def _apply_sanitization(self, content: str, threats: List[SecurityThreat]) -> str:
-        """Aplica sanitización basada en amenazas detectadas"""
-        sanitized = content
-        
-        for threat in threats:
-            if threat.severity in ['critical', 'high']:
-                # Reemplazar contenido peligroso
-                sanitized = sanitized.replace(threat.original_content, threat.sanitized_content)
-        
-        return sanitized
+    def _apply_sanitization(self, content: str,
+                            threats: Union[ThreatList, Iterable[SecurityThreat]]) -> str:
+        """
+        Aplica sanitización basada en amenazas detectadas
+
+        Sustituye las posiciones de las amenazas graves en una sola pasada:
+        los tramos que se solapan se funden en uno (con el reemplazo del
+        primero) y el texto se reconstruye de una vez, en tiempo lineal.
+        """
+        if isinstance(threats, ThreatList):
+            redactions = sorted(threats.redactions())
+        else:
+            redactions = sorted(
+                (start, end, threat.sanitized_content)
+                for threat in threats if threat.severity in _BLOCKING_SEVERITIES
+                for start, end in threat.spans
+            )
+        if not redactions:
+            return content
+        
+        pieces = []
+        position = 0
+        for start, end, replacement in redactions:
+            if start < position:
+                # Se solapa con el tramo anterior: lo alarga
+                position = max(position, end)
+                continue
+            pieces.append(content[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(content[position:])
+        return ''.join(pieces)
     
     def scan_newsletter_content(self, newsletter_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Escanea todo el contenido del newsletter en busca de amenazas
         """
         sanitized_data = newsletter_data.copy()
-        total_threats = []
+        total_threats: List[ThreatList] = []
         
         # Escanear noticias
         if 'stories' in sanitized_data:
             safe_stories = []
-            for story in sanitized_data['stories']:
-                is_safe, sanitized_title, threats = self.scan_content(story.get('title', ''), 'story_title')
-                story['title'] = sanitized_title
-                total_threats.extend(threats)
+            story_fields = ('title', 'description', 'link')
+            results = self.scan_many(sanitized_data['stories'], story_fields,
+                                     {field: f'story_{field}' for field in story_fields})
+            for story, scanned in zip(sanitized_data['stories'], results):
+                story_threats = []
+                for field in story_fields:
+                    is_safe, sanitized_value, threats = scanned[field]
+                    story[field] = sanitized_value
+                    story_threats.append(threats)
                 
-                is_safe, sanitized_desc, threats = self.scan_content(story.get('description', ''), 'story_description')
-                story['description'] = sanitized_desc
-                total_threats.extend(threats)
-                
-                is_safe, sanitized_link, threats = self.scan_content(story.get('link', ''), 'story_link')
-                story['link'] = sanitized_link
-                total_threats.extend(threats)
+                total_threats.extend(story_threats)
                 
                 # Solo incluir historias seguras
-                critical_threats = [t for t in threats if t.severity in ['critical', 'high']]
-                if len(critical_threats) == 0:
+                if not any(threats.is_blocking() for threats in story_threats):
                     safe_stories.append(story)
                 else:
-                    security_logger.warning(f"Historia removida por amenazas críticas: {story.get('title', 'Sin título')}")
+                    security_logger.warning("Historia removida por amenazas críticas: %s",
+                                            story.get('title', 'Sin título'))
             
             sanitized_data['stories'] = safe_stories
         
@@ -312,44 +579,48 @@ class PromptInjectionGuard:
         for section in content_sections:
             if section in sanitized_data:
                 safe_items = []
-                for item in sanitized_data[section]:
+                item_fields = ('title', 'desc', 'link', 'cta')
+                results = self.scan_many(sanitized_data[section], item_fields,
+                                         {field: f'{section}_{field}' for field in item_fields})
+                for item, scanned in zip(sanitized_data[section], results):
                     item_threats = []
                     
                     # Escanear cada campo del item
-                    for field in ['title', 'desc', 'link', 'cta']:
+                    for field in item_fields:
                         if field in item:
-                            is_safe, sanitized_value, threats = self.scan_content(item[field], f'{section}_{field}')
+                            is_safe, sanitized_value, threats = scanned[field]
                             item[field] = sanitized_value
-                            item_threats.extend(threats)
+                            item_threats.append(threats)
                     
                     total_threats.extend(item_threats)
                     
                     # Solo incluir items seguros
-                    critical_threats = [t for t in item_threats if t.severity in ['critical', 'high']]
-                    if len(critical_threats) == 0:
+                    if not any(threats.is_blocking() for threats in item_threats):
                         safe_items.append(item)
                     else:
-                        security_logger.warning(f"Item removido de {section} por amenazas: {item.get('title', 'Sin título')}")
+                        security_logger.warning("Item removido de %s por amenazas: %s",
+                                                section, item.get('title', 'Sin título'))
                 
                 sanitized_data[section] = safe_items
         
-        # Reportar resumen de seguridad
-        if total_threats:
-            threat_summary = {}
-            for threat in total_threats:
-                threat_summary[threat.threat_type] = threat_summary.get(threat.threat_type, 0) + 1
-            
-            security_logger.warning(f"Resumen de seguridad - Total amenazas: {len(total_threats)}")
-            for threat_type, count in threat_summary.items():
-                security_logger.warning(f"  - {threat_type}: {count}")
+        # Reportar resumen de seguridad (sin construir las amenazas)
+        threat_summary: Counter = Counter()
+        severity_summary: Counter = Counter()
+        for threats in total_threats:
+            threat_summary.update(threats.count_by(0))
+            severity_summary.update(threats.count_by(1))
+        total = sum(threat_summary.values())
+        if total and security_logger.isEnabledFor(logging.WARNING):
+            security_logger.warning("Resumen de seguridad - Total amenazas: %d (%s)", total,
+                                    ', '.join(f'{kind}: {count}' for kind, count in threat_summary.items()))
         
         # Agregar metadatos de seguridad
         sanitized_data['_security'] = {
             'scan_timestamp': '2025-09-01',
-            'threats_detected': len(total_threats),
-            'threats_critical': len([t for t in total_threats if t.severity == 'critical']),
-            'threats_high': len([t for t in total_threats if t.severity == 'high']),
-            'is_safe': len([t for t in total_threats if t.severity in ['critical', 'high']]) == 0
+            'threats_detected': total,
+            'threats_critical': severity_summary['critical'],
+            'threats_high': severity_summary['high'],
+            'is_safe': severity_summary['critical'] + severity_summary['high'] == 0
         }
         
         return sanitized_data
@@ -357,9 +628,10 @@ class PromptInjectionGuard:
     def get_security_report(self) -> Dict[str, Any]:
         """Genera un reporte de seguridad detallado"""
         return {
-            'total_threats': len(self.threats_detected),
-            'threats_by_type': {},
-            'threats_by_severity': {},
+            'total_threats': sum(self.threats_by_severity.values()),
+            'threats_by_type': dict(self.threats_by_type),
+            'threats_by_severity': dict(self.threats_by_severity),
+            'recent_threats': len(self.threats_detected),
             'recommendations': self._generate_recommendations()
         }
     
@@ -374,6 +646,53 @@ class PromptInjectionGuard:
         ]
 
 
+def _cacheable(threats: ThreatList) -> bool:
+    """Un escaneo cortado por tiempo depende de la carga de la máquina: no se cachea"""
+    return not any(hit[0] == "scan_timeout" for hit in threats.hits)
+
+
+def _log_threats(threat_lists: List[ThreatList], where: str, *args: Any):
+    """
+    Un aviso con el resumen por tipo de las amenazas de un escaneo o lote;
+    el detalle de cada una solo con el logger en DEBUG
+    """
+    if not security_logger.isEnabledFor(logging.WARNING):
+        return
+    by_type: Counter = Counter()
+    for threats in threat_lists:
+        by_type.update(threats.count_by(0))
+    security_logger.warning("Amenazas detectadas " + where + ": %d amenazas (%s)", *args,
+                            sum(by_type.values()),
+                            ', '.join(f'{kind}: {count}' for kind, count in by_type.most_common()))
+    if security_logger.isEnabledFor(logging.DEBUG):
+        for threats in threat_lists:
+            for threat in threats:
+                security_logger.debug("  - %s (%s): %s", threat.threat_type, threat.severity,
+                                      threat.description)
+
+
+def _check_deadline(deadline: float):
+    if time.perf_counter() > deadline:
+        raise ScanTimeout("presupuesto de escaneo agotado")
+
+
+# Guard de cada proceso del modo paralelo de scan_many
+_batch_guard: Optional[PromptInjectionGuard] = None
+
+
+def _init_batch_worker(rules_path: str, rule_lists: Dict[str, List[str]]):
+    """Guard del worker: el mismo archivo y las mismas listas (ya recargadas o retocadas) que el padre"""
+    global _batch_guard
+    ruleset = compile_ruleset(*(tuple(rule_lists[name]) for name in RULE_LISTS))
+    _batch_guard = PromptInjectionGuard(rules_path=rules_path, ruleset=ruleset)
+
+
+def _scan_chunk(texts: List[Tuple[str, str]]) -> List[ScanResult]:
+    all_matches = _batch_guard._match_texts([content for content, _ in texts])
+    return [ScanResult(*_batch_guard._scan_uncached(content, content_type, matches))
+            for (content, content_type), matches in zip(texts, all_matches)]
+
+
 def create_security_middleware():
     """Factory function para crear middleware de seguridad"""
     return PromptInjectionGuard()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Security Rules - Reglas de PromptInjectionGuard cargadas de un YAML
+Las listas de patrones, dominios y palabras clave viven en security_rules.yml
+y se compilan una sola vez por proceso en un Ruleset inmutable (el patrón
+combinado, el autómata de palabras clave y la política de dominios). Crear
+otro guard con las mismas reglas reutiliza ese Ruleset en vez de volver a
+compilarlo.
+
+load_ruleset() recuerda, por archivo, su mtime y tamaño y el sha256 de su
+contenido: si el archivo no ha cambiado no lo vuelve a leer, y si cambia
+(p. ej. otra lista de bloqueo) devuelve el Ruleset nuevo sin reiniciar el
+proceso. Un archivo roto no deja al guard sin reglas: se avisa y se siguen
+usando las anteriores.
+"""
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+import yaml
+
+from src.domain_policy import DomainPolicy, get_policy
+from src.keyword_matcher import KeywordMatcher
+from src.rule_scanner import RuleScanner
+from src.scan_cache import ruleset_version
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  "security_rules.yml")
+
+# Listas que forman un conjunto de reglas, en el orden de Ruleset
+RULE_LISTS = ('injection_patterns', 'suspicious_patterns', 'malicious_domains', 'ai_forbidden_keywords')
+
+
+@dataclass(frozen=True)
+class Ruleset:
+    """Reglas del guard y sus estructuras compiladas, compartidas entre guards"""
+    injection_patterns: Tuple[str, ...]
+    suspicious_patterns: Tuple[str, ...]
+    malicious_domains: Tuple[str, ...]
+    ai_forbidden_keywords: Tuple[str, ...]
+    rule_scanner: RuleScanner
+    keyword_matcher: KeywordMatcher
+    domain_policy: DomainPolicy
+    fingerprint: str
+
+    def lists(self) -> Dict[str, Tuple[str, ...]]:
+        return {name: getattr(self, name) for name in RULE_LISTS}
+
+
+@lru_cache(maxsize=8)
+def compile_ruleset(injection_patterns: Tuple[str, ...], suspicious_patterns: Tuple[str, ...],
+                    malicious_domains: Tuple[str, ...], ai_forbidden_keywords: Tuple[str, ...]) -> Ruleset:
+    """Compila (una vez por combinación de listas) el patrón combinado, el autómata y la política"""
+    # Todas las reglas en un único patrón: una pasada por texto
+    scanner = RuleScanner(
+        [(pattern, re.IGNORECASE | re.MULTILINE) for pattern in injection_patterns]
+        + [(pattern, re.IGNORECASE) for pattern in suspicious_patterns]
+    )
+    return Ruleset(
+        injection_patterns, suspicious_patterns, malicious_domains, ai_forbidden_keywords,
+        rule_scanner=scanner,
+        keyword_matcher=KeywordMatcher(ai_forbidden_keywords),
+        domain_policy=get_policy(deny=malicious_domains),
+        fingerprint=ruleset_version(injection_patterns, suspicious_patterns,
+                                    malicious_domains, ai_forbidden_keywords),
+    )
+
+
+def parse_ruleset(data: Any) -> Dict[str, Tuple[str, ...]]:
+    """Valida el YAML ya cargado: un mapa con las cuatro listas de textos"""
+    if not isinstance(data, dict):
+        raise ValueError("el archivo de reglas debe ser un mapa de listas")
+    unknown = set(data) - set(RULE_LISTS)
+    if unknown:
+        raise ValueError(f"listas desconocidas: {', '.join(sorted(unknown))}")
+    lists = {}
+    for name in RULE_LISTS:
+        values = data.get(name) or []
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"{name} debe ser una lista de textos")
+        lists[name] = tuple(values)
+    return lists
+
+
+# Por archivo: ((mtime_ns, tamaño), sha256 del contenido, Ruleset)
+_loaded: Dict[str, Tuple[Tuple[int, int], str, Ruleset]] = {}
+_lock = threading.Lock()
+
+
+def load_ruleset(path: str = DEFAULT_RULES_PATH) -> Ruleset:
+    """
+    Ruleset del archivo, leyéndolo y compilándolo solo si ha cambiado
+
+    La primera carga propaga los errores (sin reglas no se puede escanear);
+    en las siguientes, un archivo ilegible o inválido mantiene las reglas
+    anteriores.
+    """
+    path = os.path.abspath(path)
+    with _lock:
+        loaded = _loaded.get(path)
+    signature = None
+    try:
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if loaded is not None and loaded[0] == signature:
+            return loaded[2]
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if loaded is not None and loaded[1] == digest:
+            ruleset = loaded[2]     # mismo contenido (p. ej. un touch): nada que compilar
+        else:
+            ruleset = compile_ruleset(*parse_ruleset(yaml.safe_load(raw)).values())
+    except (OSError, ValueError, yaml.YAMLError, re.error) as e:
+        if loaded is None:
+            raise
+        print(f"⚠️ Reglas de seguridad ilegibles en {path}, se mantienen las anteriores: {e}")
+        if signature is not None:
+            # No volver a intentarlo hasta que el archivo cambie otra vez
+            with _lock:
+                _loaded[path] = (signature, loaded[1], loaded[2])
+        return loaded[2]
+
+    with _lock:
+        _loaded[path] = (signature, digest, ruleset)
+    if loaded is not None and ruleset is not loaded[2]:
+        print(f"🛡️ Reglas de seguridad recargadas de {path}: "
+              f"{len(ruleset.injection_patterns) + len(ruleset.suspicious_patterns)} patrones, "
+              f"{len(ruleset.malicious_domains)} dominios, {len(ruleset.ai_forbidden_keywords)} palabras clave")
+    return ruleset
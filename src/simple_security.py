@@ -3,6 +3,8 @@ Seguridad Básica para Newsletter - Solo lo esencial
 """
 import html
 import urllib.parse
+from src.domain_policy import get_policy
+from src.story import Story
 
 class SimpleSecurityGuard:
     """Seguridad mínima necesaria para el newsletter"""
@@ -18,16 +20,10 @@ class SimpleSecurityGuard:
     
     @staticmethod
     def is_safe_url(url):
-        """Verificar si una URL es de un dominio confiable"""
+        """Verificar si una URL es de un dominio confiable (o de un subdominio suyo)"""
         try:
-            parsed = urllib.parse.urlparse(url)
-            domain = parsed.netloc.lower()
-            
-            # Remover www. si existe
-            if domain.startswith('www.'):
-                domain = domain[4:]
-            
-            return domain in SimpleSecurityGuard.TRUSTED_DOMAINS
+            domain = urllib.parse.urlsplit(url).hostname or ''
+            return get_policy(SimpleSecurityGuard.TRUSTED_DOMAINS).is_allowed(domain)
         except:
             return False
     
@@ -40,7 +36,14 @@ class SimpleSecurityGuard:
     
     @staticmethod
     def validate_content(item):
-        """Validar que un item de contenido sea seguro"""
+        """Validar que un item de contenido (dict o Story) sea seguro"""
+        if isinstance(item, Story):
+            if not SimpleSecurityGuard.is_safe_url(item.link):
+                return False
+            item.title = SimpleSecurityGuard.sanitize_html(item.title)
+            item.summary = SimpleSecurityGuard.sanitize_html(item.summary)
+            return True
+        
         if not isinstance(item, dict):
             return False
         
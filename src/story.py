@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Story - Registro compacto de una noticia
+Es lo único que circula desde el parseo hasta la plantilla: título, enlace,
+resumen, fuente y fecha como entero epoch. Con __slots__ cada noticia ocupa
+una fracción de un FeedParserDict o de un dict equivalente.
+"""
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+# Entidad HTML sin cerrar al final del texto (el corte caería dentro)
+_PARTIAL_ENTITY = re.compile(r'&#?\w*$')
+
+# Titular de las entradas que no traen uno (los parsers dan '')
+DEFAULT_TITLE = 'Sin título'
+
+
+@dataclass(slots=True)
+class Story:
+    """Noticia lista para seleccionar y renderizar en src/template.html"""
+    title: str
+    link: str
+    summary: str = ''
+    source: str = ''
+    timestamp: int = 0      # epoch UTC de publicación (0 si el feed no la da)
+    scanned: bool = False   # ya pasó PromptInjectionGuard: campos saneados y seguros
+
+    def __post_init__(self):
+        if not self.title or not self.title.strip():
+            self.title = DEFAULT_TITLE
+
+    @property
+    def published_parsed(self) -> Optional[time.struct_time]:
+        """Fecha como struct_time UTC, igual que en las entradas de feedparser"""
+        return time.gmtime(self.timestamp) if self.timestamp else None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Acceso estilo dict, para tratarla igual que una entrada de feedparser"""
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def excerpt(text: str, limit: int) -> str:
+    """
+    Recorta text a como mucho limit caracteres y añade "…"
+
+    Corta por el último espacio para no partir palabras ni URLs; si no hay
+    ninguno (p. ej. texto CJK) corta en limit, pero nunca dentro de una
+    entidad HTML (&lt;, &#39;...), así que el extracto de un texto saneado
+    sigue siendo texto saneado.
+    """
+    if len(text) <= limit:
+        return text + "…"
+    cut = max(text.rfind(space, 0, limit + 1) for space in (' ', '\n', '\t'))
+    if cut <= 0:
+        cut = limit
+        entity = _PARTIAL_ENTITY.search(text, 0, limit)
+        if entity and entity.start() > 0:
+            cut = entity.start()
+    return text[:cut] + "…"
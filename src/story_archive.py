@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Story Archive - Histórico de noticias en SQLite
+Tabla persistente de noticias indexada por enlace canónico, con índices por
+fecha de publicación y por fuente. El top 10 de cada edición es una consulta
+indexada (solo noticias no enviadas), y comprobar si una noticia ya se envió
+es una búsqueda por clave primaria, así que años de histórico no frenan el
+envío diario. La tabla meta guarda cuándo pasó el colector por última vez,
+haya encontrado noticias nuevas o no.
+"""
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from src.story import Story
+from src.story_dedup import canonical_link
+
+DEFAULT_ARCHIVE_PATH = ".cache/stories.sqlite3"
+STORY_MAX_AGE = 3 * 24 * 3600   # ventana de publicación para elegir noticias
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    link_key     TEXT PRIMARY KEY,
+    title        TEXT NOT NULL,
+    link         TEXT NOT NULL,
+    published_ts INTEGER NOT NULL,
+    source       TEXT NOT NULL,
+    position     INTEGER NOT NULL,
+    first_seen   INTEGER NOT NULL,
+    sent_at      INTEGER
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_stories_published ON stories (published_ts);
+CREATE INDEX IF NOT EXISTS idx_stories_source ON stories (source, published_ts);
+CREATE INDEX IF NOT EXISTS idx_stories_first_seen ON stories (first_seen);
+CREATE INDEX IF NOT EXISTS idx_stories_unsent ON stories (published_ts) WHERE sent_at IS NULL;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# (posición en el feed, noticia)
+StoryRow = Tuple[int, Story]
+
+
+class StoryArchive:
+    """
+    Histórico de noticias (Story) ya validadas, con su posición en el feed
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_ARCHIVE_PATH):
+        self.path = path or ':memory:'
+        directory = os.path.dirname(self.path) if path else ''
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(SCHEMA)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+
+    def save(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def contains(self, link: str) -> bool:
+        row = self._db.execute("SELECT 1 FROM stories WHERE link_key = ?", (canonical_link(link),))
+        return row.fetchone() is not None
+
+    def was_sent(self, link: str) -> bool:
+        """Indica si la noticia ya salió en una edición anterior"""
+        row = self._db.execute("SELECT sent_at FROM stories WHERE link_key = ?", (canonical_link(link),))
+        found = row.fetchone()
+        return bool(found and found[0] is not None)
+
+    def add(self, story: Story, position: int, now: Optional[float] = None) -> bool:
+        """Guarda una noticia; devuelve False si ya estaba en el histórico"""
+        key = canonical_link(story.link) or f"{story.source}#{story.title}"
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO stories (link_key, title, link, published_ts, "
+            "source, position, first_seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, story.title, story.link, story.timestamp, story.source, position,
+             int(time.time() if now is None else now)),
+        )
+        return cursor.rowcount > 0
+
+    def mark_sent(self, links: Iterable[str], now: Optional[float] = None) -> int:
+        """Marca como enviadas las noticias de una edición"""
+        sent_at = int(time.time() if now is None else now)
+        cursor = self._db.executemany(
+            "UPDATE stories SET sent_at = ? WHERE link_key = ? AND sent_at IS NULL",
+            [(sent_at, canonical_link(link)) for link in links],
+        )
+        self._db.commit()
+        return cursor.rowcount
+
+    def newest(self, limit: int, max_age: float = STORY_MAX_AGE,
+               now: Optional[float] = None) -> List[StoryRow]:
+        """
+        Noticias no enviadas más recientes (consulta sobre idx_stories_unsent),
+        a igual fecha en un orden estable (por enlace canónico)
+        """
+        since = int((time.time() if now is None else now) - max_age)
+        rows = self._db.execute(
+            "SELECT position, title, link, source, published_ts FROM stories "
+            "WHERE sent_at IS NULL AND published_ts >= ? "
+            "ORDER BY published_ts DESC, link_key LIMIT ?",
+            (since, limit),
+        )
+        return [
+            (position, Story(title=title, link=link, source=source, timestamp=ts))
+            for position, title, link, source, ts in rows
+        ]
+
+    def mark_collected(self, now: Optional[float] = None):
+        """Registra una pasada del colector (aunque no trajera noticias nuevas)"""
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_collected', ?)",
+                         (int(time.time() if now is None else now),))
+
+    def last_collected(self) -> Optional[int]:
+        """Epoch de la última pasada del colector (o de la última noticia, en históricos antiguos)"""
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'last_collected'").fetchone()
+        if row is not None:
+            return row[0]
+        return self._db.execute("SELECT MAX(first_seen) FROM stories").fetchone()[0]
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Story Dedup - Deduplicación de noticias entre feeds
+Una misma noticia suele llegar desde varios medios con enlaces y titulares
+distintos. Se detecta por enlace canónico (sin parámetros de tracking) y por
+titulares casi idénticos mediante MinHash + LSH, en tiempo lineal sobre los
+candidatos en lugar de comparar todos los pares. Solo se indexan las
+noticias que siguen en el top-k (y las versiones que desplazaron), así que
+la memoria no crece con el número de noticias procesadas.
+"""
+import hashlib
+import random
+import re
+import unicodedata
+import urllib.parse
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from src.feed_registry import canonical_url
+from src.story import DEFAULT_TITLE
+from src.top_k import TopK
+
+# Parámetros de query que solo sirven para tracking
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ref_src', 'cmpid', 'ncid', 'mkt_tok', '_hsenc', '_hsmi', 'spm',
+})
+TRACKING_PREFIXES = ('utm_',)
+
+# Palabras vacías (inglés y español) que no distinguen titulares
+STOPWORDS = frozenset("""
+a an and are as at be by for from has in is it its of on or that the this to with
+al con de del el en es la las lo los para por se su sus un una y
+""".split())
+
+SIMILARITY_THRESHOLD = 0.6  # Jaccard mínimo entre titulares duplicados
+MIN_TITLE_TOKENS = 3        # con menos palabras, solo cuentan los titulares idénticos
+NUM_PERM = 32
+BANDS = 16                  # 16 bandas x 2 filas
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _is_tracking(param: str) -> bool:
+    param = param.lower()
+    return param in TRACKING_PARAMS or param.startswith(TRACKING_PREFIXES)
+
+
+def strip_tracking(url: str) -> str:
+    """
+    Elimina los parámetros de tracking (utm_*, fbclid, ...) de un enlace
+
+    El resto de la query se conserva tal cual (sin volver a codificarla), así
+    que el enlace sigue apuntando exactamente a la misma página.
+    """
+    url = url.strip()
+    parsed = urllib.parse.urlsplit(url)
+    if not parsed.query:
+        return url
+    pairs = parsed.query.split('&')
+    kept = [pair for pair in pairs if not _is_tracking(urllib.parse.unquote_plus(pair.split('=', 1)[0]))]
+    if len(kept) == len(pairs):
+        return url
+    return urllib.parse.urlunsplit(parsed._replace(query='&'.join(kept)))
+
+
+def canonical_link(url: str) -> str:
+    """Clave de un enlace de noticia: sin tracking, query ordenada y URL canónica"""
+    parsed = urllib.parse.urlsplit(strip_tracking(url))
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return canonical_url(urllib.parse.urlunsplit(parsed._replace(query=query)))
+
+
+def title_tokens(title: str) -> FrozenSet[str]:
+    """Palabras significativas de un titular, sin tildes ni mayúsculas"""
+    if title == DEFAULT_TITLE:
+        return frozenset()  # el titular por defecto no distingue noticias
+    normalized = unicodedata.normalize('NFKD', title or '')
+    normalized = ''.join(c for c in normalized if not unicodedata.combining(c)).lower()
+    return frozenset(w for w in _WORD_RE.findall(normalized) if w not in STOPWORDS)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def similar_titles(a: FrozenSet[str], b: FrozenSet[str], threshold: float = SIMILARITY_THRESHOLD) -> bool:
+    """
+    Indica si dos titulares son la misma noticia: en los muy cortos una sola
+    palabra distinta cambia la noticia ("Gemini 3 Pro" / "Gemini 3 Flash")
+    """
+    if min(len(a), len(b)) < MIN_TITLE_TOKENS:
+        return bool(a) and a == b
+    return jaccard(a, b) >= threshold
+
+
+class StoryDeduper:
+    """
+    Índice de noticias ya vistas
+    Las coincidencias de LSH se confirman con el Jaccard exacto de los
+    titulares, así que no hay falsos positivos por colisiones de MinHash.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD,
+                 num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm debe ser múltiplo de bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Cada "permutación" es un XOR con una máscara aleatoria de 64 bits;
+        # semilla fija para que los resultados sean reproducibles
+        rng = random.Random(1)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+        self._last: Tuple[FrozenSet[str], List[Tuple[int, Tuple[int, ...]]]] = (frozenset(), [])
+        self._next_id = 0
+        self._tokens: Dict[int, FrozenSet[str]] = {}
+        # Id -> (enlace canónico, claves LSH), para sacarlo del índice sin recalcular
+        self._entries: Dict[int, Tuple[Optional[str], List[Tuple[int, Tuple[int, ...]]]]] = {}
+        self._by_link: Dict[str, List[int]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+
+    def signature(self, tokens: FrozenSet[str]) -> List[int]:
+        """Firma MinHash de un conjunto de palabras"""
+        hashes = [int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=8).digest(), 'little')
+                  for t in tokens]
+        return [min([h ^ mask for h in hashes]) for mask in self._masks]
+
+    def _band_keys(self, tokens: FrozenSet[str]) -> List[Tuple[int, Tuple[int, ...]]]:
+        if not tokens:
+            return []
+        # matches() y add() suelen llegar seguidos con el mismo titular
+        if tokens == self._last[0]:
+            return self._last[1]
+        sig = self.signature(tokens)
+        keys = [(band, tuple(sig[band * self.rows:(band + 1) * self.rows]))
+                for band in range(self.bands)]
+        self._last = (tokens, keys)
+        return keys
+
+    def matches(self, title: str, link: str) -> List[int]:
+        """Ids de las noticias indexadas que son duplicado de esta"""
+        found = set(self._by_link.get(canonical_link(link), ())) if link else set()
+        tokens = title_tokens(title)
+        for key in self._band_keys(tokens):
+            for story_id in self._buckets.get(key, ()):
+                if story_id not in found and similar_titles(tokens, self._tokens[story_id], self.threshold):
+                    found.add(story_id)
+        return sorted(found)
+
+    def add(self, title: str, link: str) -> int:
+        """Indexa una noticia y devuelve su id"""
+        story_id = self._next_id
+        self._next_id += 1
+        tokens = title_tokens(title)
+        self._tokens[story_id] = tokens
+        link_key = canonical_link(link) if link else None
+        if link_key is not None:
+            self._by_link.setdefault(link_key, []).append(story_id)
+        keys = self._band_keys(tokens)
+        for key in keys:
+            self._buckets.setdefault(key, []).append(story_id)
+        self._entries[story_id] = (link_key, keys)
+        return story_id
+
+    def remove(self, story_id: int):
+        """Saca una noticia del índice (no vuelve a aparecer en matches())"""
+        if self._tokens.pop(story_id, None) is None:
+            return
+        link_key, keys = self._entries.pop(story_id)
+        for index, key in ((self._by_link, link_key), *((self._buckets, key) for key in keys)):
+            ids = index.get(key)
+            if ids is not None and story_id in ids:
+                ids.remove(story_id)
+                if not ids:
+                    del index[key]
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+
+class DedupTopK:
+    """
+    Top-k de noticias sin duplicados entre feeds
+    De cada grupo de duplicados se conserva la versión más reciente
+    (a igual fecha, la del feed que aparece antes en rss_sources.yml).
+    Cada candidato necesita un order propio: dos iguales con la misma fecha
+    serían la misma clave y push() lo rechaza con ValueError.
+    """
+
+    def __init__(self, k: int = 10, deduper: Optional[StoryDeduper] = None):
+        self.top = TopK(k)
+        self.deduper = deduper or StoryDeduper()
+        self.duplicates = 0
+        self._kept: Dict[int, Tuple[Tuple[int, Tuple[int, ...]], Any]] = {}
+        self._by_key: Dict[Tuple[int, Tuple[int, ...]], int] = {}
+        # Noticias desplazadas -> id de la versión conservada que las sustituyó,
+        # y al revés, para olvidarlas todas cuando esa versión sale del top-k
+        self._replaced_by: Dict[int, int] = {}
+        self._cluster: Dict[int, List[int]] = {}
+        self._memo: Dict[Tuple[str, str], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.top)
+
+    def _resolve(self, story_id: int) -> int:
+        return self._replaced_by.get(story_id, story_id)
+
+    def _forget(self, story_id: int):
+        """Olvida una noticia que salió del top-k y las versiones que desplazó"""
+        key, _ = self._kept.pop(story_id)
+        del self._by_key[key]
+        for old_id in [story_id, *self._cluster.pop(story_id, ())]:
+            self.deduper.remove(old_id)
+            self._replaced_by.pop(old_id, None)
+
+    def _matches(self, title: str, link: str) -> List[int]:
+        """Ids de las versiones conservadas de las noticias duplicadas"""
+        key = (title, link)
+        if key not in self._memo:
+            found = {self._resolve(i) for i in self.deduper.matches(title, link)}
+            self._memo[key] = sorted(found)
+        return self._memo[key]
+
+    def accepts(self, timestamp: int, order: Tuple[int, ...], title: str, link: str) -> bool:
+        """
+        Indica si el candidato entraría en el top-k: debe ser más reciente que
+        el peor seleccionado y que cualquier duplicado ya conservado
+        """
+        if not self.top.accepts(timestamp, order):
+            return False
+        key = TopK._key(timestamp, order)
+        if any(self._kept[i][0] >= key for i in self._matches(title, link)):
+            self.duplicates += 1
+            return False
+        return True
+
+    def push(self, timestamp: int, item: Any, order: Tuple[int, ...], title: str, link: str) -> bool:
+        """Inserta un candidato desplazando los duplicados más antiguos"""
+        if TopK._key(timestamp, order) in self._by_key:
+            raise ValueError(f"clave repetida en el top-k: {timestamp}, {order}")
+        if not self.accepts(timestamp, order, title, link):
+            return False
+        replaced = self._matches(title, link)
+        cluster = []
+        for story_id in replaced:
+            old_key, old_item = self._kept.pop(story_id)
+            del self._by_key[old_key]
+            if self.top.remove(old_item):
+                self.duplicates += 1
+            cluster.append(story_id)
+            cluster.extend(self._cluster.pop(story_id, ()))
+        # Con el top-k lleno, el peor seleccionado sale y deja de indexarse
+        evicted = self.top.worst() if len(self.top) >= self.top.k else None
+        # El índice cambia: las coincidencias memorizadas dejan de valer
+        self._memo.clear()
+        self.top.push(timestamp, item, order)
+        if evicted is not None:
+            self._forget(self._by_key[evicted])
+        new_id = self.deduper.add(title, link)
+        key = TopK._key(timestamp, order)
+        self._kept[new_id] = (key, item)
+        self._by_key[key] = new_id
+        if cluster:
+            self._cluster[new_id] = cluster
+            for story_id in cluster:
+                self._replaced_by[story_id] = new_id
+        return True
+
+    def items(self) -> List[Any]:
+        return self.top.items()
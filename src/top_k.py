@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Top-K - Selección incremental de las noticias más recientes
+Mantiene un min-heap acotado con los k candidatos más nuevos a medida que
+llegan los feeds, en lugar de acumular y ordenar todas las entradas.
+"""
+import calendar
+import heapq
+from typing import Any, List, Optional, Tuple
+
+
+def to_epoch(parsed: Any, default: int) -> int:
+    """Convierte un struct_time UTC (published_parsed) a segundos epoch"""
+    if not parsed:
+        return default
+    try:
+        return calendar.timegm(parsed)
+    except (TypeError, ValueError, OverflowError):
+        return default
+
+
+class TopK:
+    """
+    Conserva los k elementos con mayor timestamp en memoria O(k)
+
+    Los empates se resuelven por `order` ascendente, igual que un
+    sort(reverse=True) estable sobre los elementos en orden de llegada.
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self._heap: List[Tuple[int, Tuple[int, ...], Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @staticmethod
+    def _key(timestamp: int, order: Tuple[int, ...]) -> Tuple[int, Tuple[int, ...]]:
+        # En el min-heap queda arriba el peor candidato: más antiguo y, a igual
+        # fecha, el de mayor order
+        return timestamp, tuple(-o for o in order)
+
+    def accepts(self, timestamp: int, order: Tuple[int, ...] = ()) -> bool:
+        """Indica si un candidato entraría en el top-k actual (sin insertarlo)"""
+        if self.k <= 0:
+            return False
+        if len(self._heap) < self.k:
+            return True
+        return self._key(timestamp, order) > self._heap[0][:2]
+
+    def push(self, timestamp: int, item: Any, order: Tuple[int, ...] = ()) -> bool:
+        """Inserta un candidato; devuelve False si no entra en el top-k"""
+        if not self.accepts(timestamp, order):
+            return False
+        entry = (*self._key(timestamp, order), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        else:
+            heapq.heapreplace(self._heap, entry)
+        return True
+
+    def worst(self) -> Optional[Tuple[int, Tuple[int, ...]]]:
+        """Clave del peor seleccionado, el que sale si se inserta otro con el top-k lleno"""
+        return self._heap[0][:2] if self._heap else None
+
+    def remove(self, item: Any) -> bool:
+        """Retira un elemento seleccionado (comparado por identidad)"""
+        for position, entry in enumerate(self._heap):
+            if entry[2] is item:
+                self._heap[position] = self._heap[-1]
+                self._heap.pop()
+                heapq.heapify(self._heap)
+                return True
+        return False
+
+    def items(self) -> List[Any]:
+        """Elementos seleccionados, del más reciente al más antiguo"""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
@@ -7,6 +7,7 @@ import sys
 sys.path.append('/workspaces/cafe-con-ia')
 
 from src.content_rotator import ContentRotator
+from src.feed_registry import load_registry
 import yaml
 
 def validate_system():
@@ -63,8 +64,7 @@ def validate_system():
     # 3. Validar feeds RSS expandidos
     print("\n📡 VALIDANDO FEEDS RSS...")
     try:
-        with open('/workspaces/cafe-con-ia/rss_sources.yml', 'r', encoding='utf-8') as f:
-            rss_feeds = yaml.safe_load(f)
+        rss_feeds = load_registry('/workspaces/cafe-con-ia/rss_sources.yml').urls
         
         total_feeds = len(rss_feeds)
         youtube_feeds = len([feed for feed in rss_feeds if 'youtube.com' in feed])